@@ -0,0 +1,516 @@
+import argparse
+import os
+import tempfile
+import time
+import fitz  # PyMuPDF
+
+#Benchmarks for the slow paths of the cropping and extraction scripts.
+#Each one builds a synthetic document unless a PDF is passed with --pdf.
+
+SAMPLE_TEXT = "The quick brown fox jumps over the lazy dog while the printer keeps on printing. "
+
+def make_sample_pdf(path, pages=50, lines=40):
+    """
+    Writes a letter-sized document with a header, body text and a footer on every page.
+    """
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 40), f"Chapter {page_num // 10 + 1}", fontsize=9)
+        for line in range(lines):
+            page.insert_text((72, 90 + line * 15), SAMPLE_TEXT[:70 + line % 10], fontsize=11)
+        page.insert_text((300, 760), str(page_num + 1), fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def bench_preview(pdf_path, pages, tmp_dir):
+    """
+    Pages per second of the old 200 dpi pdf2image + LANCZOS path against rendering at preview size.
+    """
+    from pdf2image import convert_from_path
+    from PIL import Image
+    from preview import render_preview
+
+    def pdf2image_path():
+        for page_num in range(1, pages + 1):
+            img = convert_from_path(pdf_path, dpi=200, first_page=page_num, last_page=page_num)[0]
+            img.resize((600, 800), Image.LANCZOS)
+
+    def direct_path():
+        doc = fitz.open(pdf_path)
+        for page_num in range(pages):
+            render_preview(doc[page_num])
+        doc.close()
+
+    old, _ = timed(pdf2image_path)
+    new, _ = timed(direct_path)
+    print(f"pdf2image 200 dpi + LANCZOS: {pages / old:8.1f} pages/s")
+    print(f"render_preview:              {pages / new:8.1f} pages/s ({old / new:.1f}x)")
+
+def bench_layout(pdf_path, pages, tmp_dir):
+    """
+    Per-page cost of extracting word and block boxes with get_text against reading them from the LayoutCache,
+    on a cold cache (extract and store) and a warm one, as on a re-run with other margins.
+    """
+    import numpy as np
+    from page_analysis import words_array, blocks_array, LayoutCache
+
+    doc = fitz.open(pdf_path)
+    cache = LayoutCache(os.path.join(tmp_dir, 'layout'))
+
+    def analyse(cache=None):
+        return [(words_array(doc[page_num], cache), blocks_array(doc[page_num], cache)) for page_num in range(pages)]
+
+    plain, reference = timed(analyse)
+    cold, _ = timed(analyse, cache)
+    warm, cached = timed(analyse, cache)
+    doc.close()
+    assert all(np.array_equal(a, b) for pair in zip(reference, cached) for a, b in zip(*pair))
+    print(f"get_text:   {plain / pages * 1000:8.2f} ms/page")
+    print(f"cold cache: {cold / pages * 1000:8.2f} ms/page")
+    print(f"warm cache: {warm / pages * 1000:8.2f} ms/page ({plain / warm:.1f}x)")
+
+def bench_matching(pdf_path, pages, tmp_dir):
+    """
+    Per-page latency of full-page BGR template matching against the grayscale band and pyramid matcher.
+    Every page gets the same distinctive strip a few pixels off from page to page, so each page has exactly
+    one right answer; both engines are checked against it rather than against each other.
+    """
+    import cv2
+    import numpy as np
+    from PIL import ImageDraw
+    from preview import render_preview
+    from template_matching import TemplateMatcher
+
+    doc = fitz.open(pdf_path)
+    images = [render_preview(doc[page_num]) for page_num in range(pages)]
+    doc.close()
+    template_y = 400
+    marker_ys = [template_y + (page_num * 7) % 21 - 10 for page_num in range(pages)]
+    for img, marker_y in zip(images, marker_ys):
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([(30, marker_y - 12), (570, marker_y + 12)], fill=(255, 255, 255))
+        for i in range(12):
+            x = 40 + i * 44
+            draw.rectangle([(x, marker_y - 8 + i % 4), (x + 14 + (i % 3) * 8, marker_y + 8)], fill=(0, 0, 0))
+    expected = [marker_y - 15 for marker_y in marker_ys]
+    template_bgr = cv2.cvtColor(np.array(images[0]), cv2.COLOR_RGB2BGR)[marker_ys[0] - 15:marker_ys[0] + 15, :, :]
+
+    def full_page():
+        results = []
+        for img in images:
+            img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+            result = cv2.matchTemplate(img_cv, template_bgr, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            results.append((max_loc[1], max_val))
+        return results
+
+    def correct(results):
+        return sum(abs(y - expected_y) <= 1 for (y, _), expected_y in zip(results, expected))
+
+    old, reference = timed(full_page)
+    print(f"full page BGR:    {old / pages * 1000:7.2f} ms/page ({correct(reference)}/{pages} pages on the strip)")
+    for levels in (0, 1, 2):
+        matcher = TemplateMatcher(template_bgr[:, :, ::-1], pyramid_levels=levels)
+        new, results = timed(lambda: [matcher.match(img, template_y) for img in images])
+        print(f"band, {levels} pyramid: {new / pages * 1000:7.2f} ms/page ({old / new:.1f}x, "
+              f"{correct(results)}/{pages} pages on the strip)")
+
+def bench_adaptive(pdf_path, pages, tmp_dir):
+    """
+    Total OCR time of a single pass at HIGH_DPI against the adaptive mode (LOW_DPI first, HIGH_DPI only
+    for low-confidence pages), and how many pages the adaptive mode had to OCR twice.
+    """
+    from ocr_common import HIGH_DPI
+    from extract_t import pdf_to_text
+
+    subset_path = os.path.join(tmp_dir, 'adaptive.pdf')
+    with fitz.open(pdf_path) as doc:
+        doc.select(list(range(pages)))
+        doc.save(subset_path)
+    workers = os.cpu_count()
+    single, _ = timed(pdf_to_text, subset_path, os.path.join(tmp_dir, 'single.txt'), workers=workers, dpi=HIGH_DPI)
+    adaptive_output = os.path.join(tmp_dir, 'adaptive.txt')
+    adaptive, _ = timed(pdf_to_text, subset_path, adaptive_output, workers=workers, adaptive=True)
+    with open(os.path.splitext(adaptive_output)[0] + '.ocr.tsv', encoding='utf-8') as f:
+        retried = sum(line.rstrip('\n').endswith('\t1') for line in f)
+    print(f"single pass at {HIGH_DPI} dpi: {single:7.1f}s")
+    print(f"adaptive:            {adaptive:7.1f}s ({single / adaptive:.1f}x), {retried} of {pages} pages OCR'd twice")
+
+def pdf_box(doc, page):
+    """
+    Returns the page's CropBox (or MediaBox, if it has none) as written in the PDF, independent of how
+    either library reports boxes.
+    """
+    kind, value = doc.xref_get_key(page.xref, "CropBox")
+    if kind != 'array':
+        kind, value = doc.xref_get_key(page.xref, "MediaBox")
+    return [float(v) for v in value.strip('[]').split()]
+
+def bench_backends(pdf_path, pages, tmp_dir):
+    """
+    Time and Python allocations of applying the click_crop ratios with each crop backend, in every mode,
+    failing if the CropBox entries of the two outputs differ by more than a hundredth of a point.
+    A page whose MediaBox does not start at the origin is appended to catch coordinate mix-ups.
+    """
+    from crop_backends import BACKENDS, KEPT_RANGES
+
+    subset_path = os.path.join(tmp_dir, 'backends.pdf')
+    with fitz.open(pdf_path) as doc:
+        doc.select(list(range(pages)))
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 90), SAMPLE_TEXT, fontsize=11)
+        doc.xref_set_key(page.xref, "MediaBox", "[0 100 612 892]")
+        doc.save(subset_path)
+    crop_ratios = [0.2 + 0.6 * (page_num % 7) / 6 for page_num in range(pages + 1)]
+    for mode in KEPT_RANGES:
+        cropboxes = {}
+        for name, backend in BACKENDS.items():
+            output_path = os.path.join(tmp_dir, f'{name}.pdf')
+            elapsed, peak, _ = peak_memory(backend, subset_path, output_path, crop_ratios, mode)
+            print(f"{mode:17s} {name:7s} {elapsed * 1000:8.1f} ms, {peak / 2**20:7.2f} MiB allocated, "
+                  f"{os.path.getsize(output_path) / 1024:8.0f} KiB")
+            with fitz.open(output_path) as doc:
+                cropboxes[name] = [pdf_box(doc, page) for page in doc]
+        error = max(abs(a - b) for rects in zip(*cropboxes.values()) for a, b in zip(*rects))
+        if error > 0.01:
+            raise SystemExit(f"{mode}: the backends' cropboxes differ by up to {error:.3f} points")
+
+def bench_bbox(pdf_path, pages, tmp_dir):
+    """
+    Per-page cost of the old per-word fitz.Rect union against the vectorized routine, checking both agree.
+    """
+    import numpy as np
+    from page_analysis import filter_main_text, union_boxes
+
+    def loop_bbox(words, page_height):
+        main_text_bbox = None
+        for x0, y0, x1, y1, *rest in words:
+            if y0 >= page_height * 0.05 and y1 <= page_height * 0.9:
+                word_rect = fitz.Rect(x0, y0, x1, y1)
+                main_text_bbox = word_rect if main_text_bbox is None else main_text_bbox | word_rect
+        return main_text_bbox
+
+    doc = fitz.open(pdf_path)
+    pages_words = [(doc[page_num].get_text("words"), doc[page_num].rect.height) for page_num in range(pages)]
+    doc.close()
+    old, expected = timed(lambda: [loop_bbox(words, height) for words, height in pages_words])
+
+    def vectorized():
+        results = []
+        for words, height in pages_words:
+            boxes = np.array([word[:4] for word in words], dtype=float) if words else np.empty((0, 4))
+            results.append(union_boxes(filter_main_text(boxes, height, 0.05, 0.1)))
+        return results
+
+    new, results = timed(vectorized)
+    mismatches = sum(a != b for a, b in zip(expected, results))
+    words = sum(len(words) for words, _ in pages_words)
+    print(f"{words / pages:.0f} words/page, {mismatches} mismatching rectangles")
+    print(f"per-word Rect union: {old / pages * 1000:7.3f} ms/page")
+    print(f"vectorized:          {new / pages * 1000:7.3f} ms/page ({old / new:.1f}x)")
+
+def bench_parallel(pdf_path, pages, tmp_dir):
+    """
+    Sequential against multi-process crop_pdf_automatically_variably, checking the outputs are byte-identical.
+    At least two workers are used even on a single CPU, so the pool always runs.
+    """
+    from crop_pdf_automatically_variably import crop_pdf_to_text_area
+
+    parallel_workers = max(2, os.cpu_count())
+    outputs = {}
+    for workers in (1, parallel_workers):
+        outputs[workers] = os.path.join(tmp_dir, f'cropped_{workers}.pdf')
+        elapsed, _ = timed(crop_pdf_to_text_area, pdf_path, outputs[workers], workers=workers)
+        print(f"{workers:2d} worker(s): {elapsed:7.2f} s")
+    with open(outputs[1], 'rb') as f:
+        sequential = f.read()
+    with open(outputs[parallel_workers], 'rb') as f:
+        parallel = f.read()
+    print("outputs identical" if sequential == parallel else "OUTPUTS DIFFER")
+
+def bench_export(pdf_path, pages, tmp_dir):
+    """
+    Time and size of crop_pdf_manually2's previous export (plain save) against the single-pass export.
+    """
+    from crop_pdf_manually2 import compute_rects, apply_adjustments, extract_and_save
+
+    doc = fitz.open(pdf_path)
+    original_rects = [page.rect for page in doc]
+    rects = compute_rects(doc, original_rects, {'l': 20, 'r': 20, 't': 30, 'b': 30}, 5)
+    apply_adjustments(doc, rects)
+
+    def plain_export(output_file):
+        new_doc = fitz.open()
+        for i, new_rect in enumerate(rects):
+            cropped_page = new_doc.new_page(width=new_rect.width, height=new_rect.height)
+            cropped_page.show_pdf_page(cropped_page.rect, doc, i)
+        new_doc.save(output_file)
+        new_doc.close()
+
+    old_path = os.path.join(tmp_dir, 'export_old.pdf')
+    new_path = os.path.join(tmp_dir, 'export_new.pdf')
+    old, _ = timed(plain_export, old_path)
+    new, _ = timed(extract_and_save, doc, rects, new_path)
+    doc.close()
+    print(f"plain save:       {old:6.2f} s, {os.path.getsize(old_path) / 1024:8.0f} KiB")
+    print(f"single pass + gc: {new:6.2f} s, {os.path.getsize(new_path) / 1024:8.0f} KiB")
+
+def make_drawings_pdf(path, pages=20, drawings=2000):
+    """
+    Writes pages of tightly spaced text over a dense vector figure, with a footnote rule near the bottom.
+    No gap between text blocks reaches cut-footnotes' SIGNIFICANT_GAP, so the drawings fallback always runs;
+    the largest gap sits below the middle of the page, so the new fallback has a region to scan.
+    """
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=612, height=792)
+        shape = page.new_shape()
+        for i in range(drawings):
+            x, y = 72 + (i * 7) % 460, 80 + (i * 13) % 400
+            shape.draw_line((x, y), (x + 5, y + 3))
+        shape.finish(width=0.5)
+        shape.draw_line((60, 628), (560, 628))
+        shape.finish(width=0.8)
+        shape.commit()
+        for line in range(31):
+            page.insert_text((72, 20 + line * 14), SAMPLE_TEXT[:70], fontsize=11)
+        for line in range(12):
+            page.insert_text((72, 468 + line * 14), SAMPLE_TEXT[:70], fontsize=11)
+        page.insert_text((72, 638), "1. A footnote.", fontsize=8)
+    doc.save(path)
+    doc.close()
+    return path
+
+def original_find_footnote_start(page):
+    """The find_footnote_start of cut-footnotes.py before it was optimized, verbatim."""
+    text_blocks = page.get_text("blocks")
+    last_y = 0
+    max_gap = 0
+    footnote_y_start = page.rect.height
+
+    # Find the largest vertical gap between successive text blocks, assuming it might indicate start of footnotes
+    for block in text_blocks:
+        rect = fitz.Rect(block[:4])
+        if rect.y0 - last_y > max_gap:
+            max_gap = rect.y0 - last_y
+            footnote_y_start = rect.y0
+        last_y = rect.y1
+
+    # Optionally check for lines if no significant gap found
+    if max_gap < 20:  # Threshold for deciding if a gap is 'significant'
+        lines = page.get_drawings()
+        for line in lines:
+            if line['width'] > page.rect.width * 0.8 and line['items'][0]['rect'].y0 < footnote_y_start:  # Assumption that line width covers most of the page width
+                footnote_y_start = line['items'][0]['rect'].y0
+
+    return footnote_y_start
+
+def bench_footnotes(pdf_path, pages, tmp_dir):
+    """
+    Per-page cost of find_footnote_start against the original version, on pages full of vector drawings
+    where both have to fall back to scanning them. Fails if the two disagree on any page.
+    Ignores --pdf: the point is the drawings-heavy synthetic page.
+    """
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('cut_footnotes', 'cut-footnotes.py')
+    cut_footnotes = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cut_footnotes)
+
+    doc = fitz.open(make_drawings_pdf(os.path.join(tmp_dir, 'drawings.pdf'), pages))
+    old, expected = timed(lambda: [original_find_footnote_start(page) for page in doc])
+    new, results = timed(lambda: [cut_footnotes.find_footnote_start(page) for page in doc])
+    doc.close()
+    print(f"footnote start: before {expected[0]:.1f}pt, after {results[0]:.1f}pt")
+    print(f"original (get_drawings):     {old / pages * 1000:8.2f} ms/page")
+    print(f"find_footnote_start (bboxes): {new / pages * 1000:8.2f} ms/page ({old / new:.1f}x)")
+    if any(abs(a - b) > 0.01 for a, b in zip(expected, results)):
+        raise SystemExit("find_footnote_start disagrees with the original")
+
+def peak_memory(function, *args, **kwargs):
+    """
+    Runs function under tracemalloc and returns (seconds, peak bytes allocated by Python, result).
+    """
+    import tracemalloc
+    tracemalloc.start()
+    elapsed, result = timed(function, *args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def bench_extract(pdf_path, pages, tmp_dir):
+    """
+    Time and peak Python memory of building the whole text in memory against streaming it to disk.
+    Use a large --pages count to see the difference grow.
+    """
+    from extract_f import extract_text, iter_text, save_to_file
+
+    old_path = os.path.join(tmp_dir, 'extract_old.txt')
+    new_path = os.path.join(tmp_dir, 'extract_new.txt')
+    old, old_peak, _ = peak_memory(lambda: save_to_file(extract_text(pdf_path), old_path))
+    new, new_peak, _ = peak_memory(save_to_file, iter_text(pdf_path), new_path)
+    with open(old_path, encoding='utf-8') as f_old, open(new_path, encoding='utf-8') as f_new:
+        identical = f_old.read() == f_new.read()
+    print(f"whole string: {old:6.2f} s, peak {old_peak / 2**20:7.1f} MiB")
+    print(f"streaming:    {new:6.2f} s, peak {new_peak / 2**20:7.1f} MiB, output {'identical' if identical else 'DIFFERS'}")
+
+def make_image_pdf(path, pages=20):
+    """
+    Writes pages with body text and a large embedded photo-sized image each.
+    """
+    doc = fitz.open()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1200, 900), False)
+    pix.set_rect(pix.irect, (180, 120, 60))
+    for _ in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(fitz.Rect(72, 400, 540, 750), pixmap=pix)
+        for line in range(20):
+            page.insert_text((72, 90 + line * 15), SAMPLE_TEXT[:70], fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+def bench_flags(pdf_path, pages, tmp_dir):
+    """
+    Per-page cost of extract_f's page_blocks with and without lean, on pages with images, failing if the
+    extracted text differs on either the image document or the sample document.
+    """
+    from extract_f import page_blocks, extract_text
+
+    image_path = make_image_pdf(os.path.join(tmp_dir, 'images.pdf'), pages)
+    doc = fitz.open(image_path)
+    old, _ = timed(lambda: [page_blocks(page) for page in doc])
+    new, _ = timed(lambda: [page_blocks(page, lean=True) for page in doc])
+    doc.close()
+    print(f"default flags: {old / pages * 1000:7.2f} ms/page")
+    print(f"lean:          {new / pages * 1000:7.2f} ms/page ({old / new:.1f}x)")
+    for path in (image_path, pdf_path):
+        if extract_text(path) != extract_text(path, lean=True):
+            raise SystemExit(f"lean output differs on {os.path.basename(path)}")
+        print(f"lean output on {os.path.basename(path)}: identical")
+
+def bench_handoff(pdf_path, pages, tmp_dir):
+    """
+    Milliseconds and Python allocations per page of the PNG round trip against the direct pixmap handoff,
+    at 300 dpi. Rendering is done up front so only the handoff is measured. tracemalloc only sees the
+    Python heap: buffers PIL allocates itself, such as the copy frombuffer makes of RGB samples, are missing.
+    """
+    import io
+    import numpy as np
+    from PIL import Image
+    from ocr_common import render_page, pixmap_to_array, pixmap_to_image
+
+    doc = fitz.open(pdf_path)
+    pixmaps = [render_page(doc[page_num], dpi=300) for page_num in range(pages)]
+    doc.close()
+
+    def png_round_trip():
+        return [np.array(Image.open(io.BytesIO(pix.tobytes("png")))) for pix in pixmaps]
+
+    for name, function in (("PNG round trip", png_round_trip),
+                           ("frombuffer (PIL)", lambda: [pixmap_to_image(pix) for pix in pixmaps]),
+                           ("array view (NumPy)", lambda: [pixmap_to_array(pix) for pix in pixmaps])):
+        elapsed, peak, _ = peak_memory(function)
+        print(f"{name:18s} {elapsed / pages * 1000:8.2f} ms/page, {peak / pages / 2**20:7.2f} MiB Python-heap only/page")
+
+def bench_skew(pdf_path, pages, tmp_dir):
+    """
+    Checks estimate_skew against the full-resolution minAreaRect angle on pages rotated by known angles,
+    failing if any differ by more than SKEW_MAX_ERROR, and compares time and peak memory per page.
+    """
+    import cv2
+    import numpy as np
+    from ocr_common import render_page, pixmap_to_array
+    from extract_t2 import skew_angle, estimate_skew, SKEW_MAX_ERROR
+
+    doc = fitz.open(pdf_path)
+    binaries = []
+    for page_num in range(min(pages, 5)):
+        gray = pixmap_to_array(render_page(doc[page_num], dpi=300, colorspace='gray'))
+        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        h, w = binary.shape
+        for rotation in (-3.0, -1.0, -0.3, 0.0, 0.5, 2.0):
+            M = cv2.getRotationMatrix2D((w // 2, h // 2), rotation, 1.0)
+            binaries.append(cv2.warpAffine(binary, M, (w, h), flags=cv2.INTER_NEAREST))
+    doc.close()
+
+    old, old_peak, reference = peak_memory(lambda: [skew_angle(np.column_stack(np.where(b > 0))) for b in binaries])
+    new, new_peak, estimates = peak_memory(lambda: [estimate_skew(b) for b in binaries])
+    error = max(abs(a - b) for a, b in zip(reference, estimates))
+    count = len(binaries)
+    print(f"full resolution: {old / count * 1000:8.1f} ms/page, peak {old_peak / 2**20:7.1f} MiB")
+    print(f"subsampled:      {new / count * 1000:8.1f} ms/page, peak {new_peak / 2**20:7.1f} MiB ({old / new:.1f}x)")
+    print(f"largest angle difference {error:.3f} degrees (bound {SKEW_MAX_ERROR})")
+    if error > SKEW_MAX_ERROR:
+        raise SystemExit("estimate_skew is outside the stated error bound")
+
+def bench_vector(pdf_path, pages, tmp_dir):
+    """
+    File size and write time of click_crop2's raster output (preview images drawn into a ReportLab canvas)
+    against the vector output of crop_backends.vector_crop, with the same crop ratios.
+    On the synthetic 20-page document: raster 504 ms and 287 KiB, vector 48 ms and 21 KiB.
+    """
+    from reportlab.pdfgen import canvas
+    from preview import render_preview
+    from crop_backends import vector_crop
+
+    crop_ratios = [0.2 + 0.6 * (page_num % 7) / 6 for page_num in range(pages)]
+    doc = fitz.open(pdf_path)
+    images = [render_preview(doc[page_num]) for page_num in range(pages)]
+    rects = [doc[page_num].rect for page_num in range(pages)]
+
+    def raster(output_path):
+        c = canvas.Canvas(output_path)
+        for page_num, ratio in enumerate(crop_ratios):
+            rect = rects[page_num]
+            lower_y = rect.height * ratio
+            c.setPageSize((rect.width, rect.height - lower_y))
+            c.drawInlineImage(images[page_num], 0, -lower_y)
+            c.showPage()
+        c.save()
+
+    subset_path = os.path.join(tmp_dir, 'vector_input.pdf')
+    doc.select(list(range(pages)))
+    doc.save(subset_path)
+    doc.close()
+    for name, function in (("raster (before)", raster),
+                           ("vector (after)", lambda path: vector_crop(subset_path, path, crop_ratios, 'crop_bottom_part'))):
+        output_path = os.path.join(tmp_dir, name.split()[0] + '.pdf')
+        elapsed, _ = timed(function, output_path)
+        print(f"{name:16s} {elapsed * 1000:8.1f} ms, {os.path.getsize(output_path) / 1024:9.1f} KiB")
+
+BENCHMARKS = {
+    'adaptive': bench_adaptive,
+    'backends': bench_backends,
+    'bbox': bench_bbox,
+    'export': bench_export,
+    'extract': bench_extract,
+    'flags': bench_flags,
+    'footnotes': bench_footnotes,
+    'handoff': bench_handoff,
+    'layout': bench_layout,
+    'matching': bench_matching,
+    'parallel': bench_parallel,
+    'preview': bench_preview,
+    'skew': bench_skew,
+    'vector': bench_vector,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run one of the benchmarks.")
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('--pdf', help="PDF to benchmark on (default: a synthetic document)")
+    parser.add_argument('--pages', type=int, default=20, help="Number of pages to process")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf or make_sample_pdf(os.path.join(tmp_dir, 'sample.pdf'), pages=args.pages)
+        with fitz.open(pdf_path) as doc:
+            pages = min(args.pages, doc.page_count)
+        BENCHMARKS[args.name](pdf_path, pages, tmp_dir)
@@ -1,6 +1,7 @@
 import tkinter as tk
-from PIL import Image, ImageTk
-from pdf2image import convert_from_path
+from PIL import ImageTk
+from preview import PageCache, PageLoader, TileCache, ZoomView
+from crop_backends import apply_crops, crop_mode
 import PyPDF2
 import os
 
@@ -13,71 +14,51 @@ class PDFCutter(tk.Tk):
         self.pdf_file = PyPDF2.PdfReader(self.pdf_path)
         self.total_pages = len(self.pdf_file.pages)
         self.current_page = 0
+        #Page of the image on screen; clicks are ignored until the page they advance to is shown
+        self.shown_page = None
         self.images = self.prepare_images()
+        self.loader = PageLoader(self, self.images, self.show_page)
         self.label = tk.Label(self)
         self.label.pack()
+        self.view = ZoomView(TileCache(self.images))
+        self.view.bind(self.label, self.show_view)
         self.crop_ratios = []
         self.cut_bottom = False
         self.keep_top = False
+        self.crop_backend = 'fitz'
         self.display_page()
     def prepare_images(self):
-        images = convert_from_path(self.pdf_path, dpi=200)
-        return [img.resize((600, 800), Image.LANCZOS) for img in images]
+        return PageCache(self.pdf_path, self.total_pages)
     def display_page(self):
         if self.current_page < self.total_pages:
-            img = self.images[self.current_page]
-            photo = ImageTk.PhotoImage(img)
-            self.label.config(image=photo)
-            self.label.image = photo
-            self.label.bind('<Button-1>', self.on_click)
+            self.view.reset()
+            self.show_view()
         else:
             self.apply_crops()
+    def show_view(self):
+        self.view.request(self.loader, self.current_page)
+    def show_page(self, page_num, img, final, view):
+        photo = ImageTk.PhotoImage(img)
+        self.label.config(image=photo)
+        self.label.image = photo
+        self.shown_page = page_num
+        self.view.shown = view
+        self.label.bind('<Button-1>', self.on_click)
     def on_click(self, event):
-        ratio = event.y / 800
+        if self.shown_page != self.current_page:
+            return
+        ratio = self.view.ratio(event.y)
         self.crop_ratios.append(ratio)
         self.current_page += 1
         self.display_page()
     def apply_crops(self):
-        output_pdf = PyPDF2.PdfWriter()
-        for index, page in enumerate(self.pdf_file.pages):
-            crop_ratio = self.crop_ratios[index]
-            if self.cut_bottom:
-                if self.keep_top:
-                    self.crop_bottom_part(page, crop_ratio)
-                else:
-                    self.keep_bottom_part(page, crop_ratio)
-            else:
-                if self.keep_top:
-                    self.crop_top_part(page, crop_ratio)
-                else:
-                    self.keep_top_part(page, crop_ratio)
-            output_pdf.add_page(page)
-        self.save_pdf(output_pdf)
-    def crop_bottom_part(self, page, ratio):
-        media_box = page.mediabox
-        new_bottom = media_box[1] + (media_box[3] - media_box[1]) * ratio
-        page.cropbox.lower_left = (media_box.lower_left[0], new_bottom)
-        page.cropbox.upper_right = (media_box.upper_right[0], media_box.upper_right[1])
-    def keep_bottom_part(self, page, ratio):
-        media_box = page.mediabox
-        new_bottom = media_box[1] + (media_box[3] - media_box[1]) * ratio
-        page.cropbox.lower_left = (media_box.lower_left[0], media_box.lower_left[1])
-        page.cropbox.upper_right = (media_box.upper_right[0], new_bottom)
-    def crop_top_part(self, page, ratio):
-        media_box = page.mediabox
-        new_top = media_box[3] - (media_box[3] - media_box[1]) * ratio
-        page.cropbox.lower_left = (media_box.lower_left[0], media_box.lower_left[1])
-        page.cropbox.upper_right = (media_box.upper_right[0], new_top)
-    def keep_top_part(self, page, ratio):
-        media_box = page.mediabox
-        new_top = media_box[3] - (media_box[3] - media_box[1]) * ratio
-        page.cropbox.lower_left = (media_box.lower_left[0], new_top)
-        page.cropbox.upper_right = (media_box.upper_right[0], media_box.upper_right[1])
-    def save_pdf(self, output_pdf):
+        self.save_pdf(crop_mode(self.cut_bottom, self.keep_top))
+    def save_pdf(self, mode):
         output_filename = 'cropped_output.pdf'
-        with open(output_filename, 'wb') as f:
-            output_pdf.write(f)
+        apply_crops(self.pdf_path, output_filename, self.crop_ratios, mode, self.crop_backend)
         print(f"All pages cropped and saved as {output_filename}.")
+        self.loader.close()
+        self.images.close()
         self.destroy()
 
 if __name__ == '__main__':
@@ -1,9 +1,12 @@
 import tkinter as tk
-from PIL import Image, ImageTk, ImageDraw
-from pdf2image import convert_from_path
+from PIL import ImageTk, ImageDraw
+from preview import PageCache, PageLoader, TileCache, ZoomView
+from template_matching import TemplateMatcher
+from crop_backends import apply_crops
 import cv2
 import numpy as np
 import PyPDF2
+from concurrent.futures import ThreadPoolExecutor
 
 class PDFCutter(tk.Tk):
     def __init__(self):
@@ -14,89 +17,125 @@ class PDFCutter(tk.Tk):
         self.pdf_file = PyPDF2.PdfReader(self.pdf_path)
         self.total_pages = len(self.pdf_file.pages)
         self.current_page = 0
+        #Page of the image on screen; clicks are ignored until the page they advance to is shown
+        self.shown_page = None
         self.images = self.prepare_images()
+        self.loader = PageLoader(self, self.images, self.show_page, self.prepare_page)
         self.label = tk.Label(self)
         self.label.pack()
+        self.view = ZoomView(TileCache(self.images))
+        self.view.bind(self.label, self.show_view)
         self.crop_ratios = []
         self.template_image = None
+        self.matcher = None
         self.average_click_position = 0
         self.selected_pages = 12
         self.prediction_phase = False
+        self.predictions = {}
+        self.executor = None
+        self.crop_backend = 'fitz'
         self.display_page()
     def prepare_images(self):
-        images = convert_from_path(self.pdf_path, dpi=200)
-        return [img.resize((600, 800), Image.LANCZOS) for img in images]
+        return PageCache(self.pdf_path, self.total_pages)
     def display_page(self):
         if self.current_page < self.total_pages:
-            img = self.images[self.current_page].copy()
-            if self.prediction_phase and self.template_image is not None:
-                match_y = self.perform_template_matching(img)
-                draw = ImageDraw.Draw(img)
-                draw.rectangle([(0, match_y), (img.width, img.height)], outline="red", width=3)
-            photo = ImageTk.PhotoImage(img)
-            self.label.config(image=photo)
-            self.label.image = photo
             if self.prediction_phase:
-                self.bind('<Return>', self.confirm_crop)
-                self.label.bind('<Button-1>', self.adjust_crop)
-            else:
-                self.label.bind('<Button-1>', self.on_click)
+                self.queue_predictions()
+            self.view.reset()
+            self.show_view()
         else:
             self.apply_crops()
+    def show_view(self):
+        self.view.request(self.loader, self.current_page)
+    def prepare_page(self, page_num, img, view):
+        #Runs on the loader thread, so waiting for the prediction does not block the window
+        #Zoomed views show the page from pixel top of the page scaled by zoom
+        if self.prediction_phase and self.template_image is not None:
+            zoom, left, top = view
+            match_y = self.predictions[page_num].result() * zoom - top
+            if match_y >= img.height:
+                return img
+            img = img.copy()
+            draw = ImageDraw.Draw(img)
+            draw.rectangle([(0, match_y), (img.width, img.height)], outline="red", width=3)
+        return img
+    def show_page(self, page_num, img, final, view):
+        photo = ImageTk.PhotoImage(img)
+        self.label.config(image=photo)
+        self.label.image = photo
+        self.shown_page = page_num
+        self.view.shown = view
+        if self.prediction_phase:
+            self.bind('<Return>', self.confirm_crop)
+            self.label.bind('<Button-1>', self.adjust_crop)
+        else:
+            self.label.bind('<Button-1>', self.on_click)
     def on_click(self, event):
-        ratio = event.y / 800
+        if self.shown_page != self.current_page:
+            return
+        ratio = self.view.ratio(event.y)
         self.crop_ratios.append(ratio)
         print(f"Training Click on Page {self.current_page + 1}: Ratio = {ratio:.4f}")
         if self.template_image is None:
             image = self.images[self.current_page]
-            self.template_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            self.template_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
             template_y = int(ratio * image.height)
-            self.template_image = self.template_image[template_y-15:template_y+15, :, :]
+            self.template_image = self.template_image[template_y-15:template_y+15, :]
+            self.matcher = TemplateMatcher(self.template_image)
             print(f"Template Snapshot saved around click.")
         self.current_page += 1
         if self.current_page == self.selected_pages:
             self.calculate_model_average()
             self.prediction_phase = True
+            self.start_predictions()
         self.display_page()
-    def perform_template_matching(self, img):
-        img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        result = cv2.matchTemplate(img_cv, self.template_image, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
-        best_match_y = max_loc[1]
+    def start_predictions(self):
+        #Rendering is serialized by the page cache, so a second thread only lets matching overlap the next render
+        self.executor = ThreadPoolExecutor(max_workers=2)
+    def queue_predictions(self):
+        #Only the pages the cache prefetches anyway are predicted, so predictions never render pages twice
+        #or evict the ones the operator is about to see
+        window_end = min(self.current_page + self.images.prefetch + 1, self.total_pages)
+        for page_num in range(self.current_page, window_end):
+            if page_num not in self.predictions:
+                self.predictions[page_num] = self.executor.submit(self.predict_page, page_num)
+        for page_num in [page_num for page_num in self.predictions if page_num < self.current_page]:
+            del self.predictions[page_num]
+    def predict_page(self, page_num):
+        return self.perform_template_matching(self.images.get(page_num), page_num)
+    def perform_template_matching(self, img, page_num=None):
+        center_y = int(self.average_click_position * img.height)
+        best_match_y, max_val = self.matcher.match(img, center_y, key=page_num)
         print(f"Template matched at y={best_match_y}px with confidence {max_val:.4f}")
         return best_match_y
     def calculate_model_average(self):
         self.average_click_position = sum(self.crop_ratios) / len(self.crop_ratios)
         print(f"Average crop position (trained model): {self.average_click_position:.4f}")
     def adjust_crop(self, event):
-        adjusted_ratio = event.y / 800
+        if self.shown_page != self.current_page:
+            return
+        adjusted_ratio = self.view.ratio(event.y)
         print(f"Adjusted crop point on Page {self.current_page + 1}: Ratio = {adjusted_ratio:.4f}")
         self.average_click_position = (self.average_click_position + adjusted_ratio) / 2
         print(f"Updated average click position: {self.average_click_position:.4f}")
         self.confirm_crop()
     def confirm_crop(self, event=None):
+        if self.shown_page != self.current_page:
+            return
         print(f"Confirmed crop for Page {self.current_page + 1}")
         self.crop_ratios.append(self.average_click_position)
         self.current_page += 1
         self.display_page()
     def apply_crops(self):
-        output_pdf = PyPDF2.PdfWriter()
-        for index, page in enumerate(self.pdf_file.pages):
-            crop_ratio = self.crop_ratios[index]
-            self.crop_bottom_part(page, crop_ratio)
-            output_pdf.add_page(page)
-        self.save_pdf(output_pdf)
-    def crop_bottom_part(self, page, ratio):
-        media_box = page.mediabox
-        new_bottom = media_box[1] + (media_box[3] - media_box[1]) * ratio
-        page.cropbox.lower_left = (media_box.lower_left[0], new_bottom)
-        page.cropbox.upper_right = (media_box.upper_right[0], media_box.upper_right[1])
-        print(f"Cropping bottom at {new_bottom:.4f} for Page {self.current_page + 1}")
-    def save_pdf(self, output_pdf):
+        self.save_pdf('crop_bottom_part')
+    def save_pdf(self, mode):
         output_filename = 'cropped_output.pdf'
-        with open(output_filename, 'wb') as f:
-            output_pdf.write(f)
+        apply_crops(self.pdf_path, output_filename, self.crop_ratios, mode, self.crop_backend)
         print(f"All pages cropped and saved as {output_filename}.")
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        self.loader.close()
+        self.images.close()
         self.destroy()
 
 if __name__ == '__main__':
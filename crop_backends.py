@@ -0,0 +1,76 @@
+import fitz  # PyMuPDF
+import PyPDF2
+
+#Backends that apply the crop ratios collected by the click_crop scripts and write the cropped PDF
+
+# Part of the page height that is kept, as (top, bottom) fractions measured from the top of the page
+KEPT_RANGES = {
+    'crop_bottom_part': lambda ratio: (0, 1 - ratio),
+    'keep_bottom_part': lambda ratio: (1 - ratio, 1),
+    'crop_top_part': lambda ratio: (ratio, 1),
+    'keep_top_part': lambda ratio: (0, ratio),
+}
+
+def crop_mode(cut_bottom, keep_top):
+    """
+    Returns the mode the cut_bottom and keep_top switches of click_crop select.
+    """
+    if cut_bottom:
+        return 'crop_bottom_part' if keep_top else 'keep_bottom_part'
+    return 'crop_top_part' if keep_top else 'keep_top_part'
+
+def pypdf2_crop(pdf_path, output_path, crop_ratios, mode):
+    """
+    Sets every cropbox through PyPDF2 page objects and writes the pages out with a PdfWriter.
+    """
+    reader = PyPDF2.PdfReader(pdf_path)
+    output_pdf = PyPDF2.PdfWriter()
+    for page, ratio in zip(reader.pages, crop_ratios):
+        top, bottom = KEPT_RANGES[mode](ratio)
+        media_box = page.mediabox
+        height = media_box[3] - media_box[1]
+        # PDF coordinates grow upwards
+        page.cropbox.lower_left = (media_box.lower_left[0], media_box[1] + height * (1 - bottom))
+        page.cropbox.upper_right = (media_box.upper_right[0], media_box[1] + height * (1 - top))
+        output_pdf.add_page(page)
+    with open(output_path, 'wb') as f:
+        output_pdf.write(f)
+
+def fitz_crop(pdf_path, output_path, crop_ratios, mode):
+    """
+    Sets every cropbox with PyMuPDF's set_cropbox and saves the document in one pass.
+    """
+    doc = fitz.open(pdf_path)
+    for page, ratio in zip(doc, crop_ratios):
+        top, bottom = KEPT_RANGES[mode](ratio)
+        media_box = page.mediabox
+        # set_cropbox measures from the top left corner of the mediabox, whatever its PDF coordinates
+        page.set_cropbox(fitz.Rect(0, media_box.height * top, media_box.width, media_box.height * bottom))
+    doc.save(output_path)
+    doc.close()
+
+def vector_crop(pdf_path, output_path, crop_ratios, mode):
+    """
+    Writes a new document whose pages are sized to the kept part of each page and show it as vector
+    content through show_pdf_page, instead of re-embedding a raster of the page.
+    """
+    source = fitz.open(pdf_path)
+    doc = fitz.open()
+    for page, ratio in zip(source, crop_ratios):
+        top, bottom = KEPT_RANGES[mode](ratio)
+        # The ratios were clicked on a preview of the visible page, so they are relative to page.rect
+        rect = page.rect
+        clip = fitz.Rect(rect.x0, rect.y0 + rect.height * top, rect.x1, rect.y0 + rect.height * bottom)
+        cropped_page = doc.new_page(width=clip.width, height=clip.height)
+        cropped_page.show_pdf_page(cropped_page.rect, source, page.number, clip=clip)
+    doc.save(output_path, garbage=3, deflate=True)
+    doc.close()
+    source.close()
+
+BACKENDS = {
+    'fitz': fitz_crop,
+    'pypdf2': pypdf2_crop,
+}
+
+def apply_crops(pdf_path, output_path, crop_ratios, mode, backend='fitz'):
+    BACKENDS[backend](pdf_path, output_path, crop_ratios, mode)
@@ -1,46 +1,30 @@
 import fitz  #PyMuPDF
 import numpy as np
+from page_analysis import words_array, filter_main_text, union_boxes, map_pages, StreamingMedianBox, LayoutCache
 
 #Assume consistent page positions and crop pages to the same box
 
-def extract_main_text_bbox(page):
+def extract_main_text_bbox(page, cache=None):
     """
     Extracts the bounding box of the main text on the page, taking into account indents and possible exclusions
-    of the first line due to vertical spacing.
+    of the first line due to vertical spacing. Word boxes come from the LayoutCache if one is given.
     """
-    words = page.get_text("words")  # Extract words as a list of (x0, y0, x1, y1, word, block_no, line_no, word_no)
-    if not words:
+    boxes = words_array(page, cache)  # One row of x0, y0, x1, y1 per word
+    if len(boxes) == 0:
         return None
 
     # Lower the top margin to catch potentially skipped first lines
     top_margin = 0.05  # Reduced top margin to 5% of the page height
     bottom_margin = 0.1  # 10% of the page height for footer
     page_height = page.rect.height
-    page_width = page.rect.width
-
-    # Initialize bounding box for the main text area
-    main_text_bbox = None
-
-    # List to store x and y coordinates separately
-    x_coords = []
-    y_coords = []
-
-    for word in words:
-        x0, y0, x1, y1 = word[:4]
-        # Check vertical boundaries with a relaxed top margin
-        if y0 >= page_height * top_margin and y1 <= page_height * (1 - bottom_margin):
-            x_coords.append(x0)
-            y_coords.append(y0)
-            word_rect = fitz.Rect(x0, y0, x1, y1)
-            if main_text_bbox is None:
-                main_text_bbox = word_rect
-            else:
-                main_text_bbox |= word_rect  # Expand the bounding box to include the word
+
+    main_text = filter_main_text(boxes, page_height, top_margin, bottom_margin)
+    main_text_bbox = union_boxes(main_text)
 
     # Adjust the bounding box to include the furthest extents found
     if main_text_bbox:
-        main_text_bbox.x0 = min(x_coords)
-        main_text_bbox.y0 = min(y_coords)  # Ensure the topmost part of the text is included
+        main_text_bbox.x0 = float(main_text[:, 0].min())
+        main_text_bbox.y0 = float(main_text[:, 1].min())  # Ensure the topmost part of the text is included
 
     return main_text_bbox
 
@@ -54,16 +38,41 @@ def calculate_median_crop_box(boxes):
     )
     return median_box
 
-def calculate_consistent_crop_box(doc, sample_size=30):
+def page_bbox(page, cache=None):
+    """
+    Returns the main text bbox of a page as a plain tuple, so it can be sent back from a worker process.
+    """
+    bbox = extract_main_text_bbox(page, cache)
+    return tuple(bbox) if bbox else None
+
+def stratified_sample(page_count, sample_size=None):
+    """
+    Spreads the sample evenly over the whole document: the page pairs are split into equal strata and
+    the middle pair of each stratum is used, so even and odd pages stay balanced.
+    With sample_size None (or at least page_count) every page is used.
+    """
+    if sample_size is None or sample_size >= page_count:
+        return list(range(page_count))
+    pair_count = (page_count + 1) // 2
+    strata = max(1, (sample_size + 1) // 2)
+    pairs = sorted({int((i + 0.5) * pair_count / strata) for i in range(strata)})
+    return [page_num for pair in pairs for page_num in (2 * pair, 2 * pair + 1) if page_num < page_count]
+
+def calculate_consistent_crop_box(doc, sample_size=30, stratified=False, workers=1, cache=None):
     """
     Calculate a consistent cropping box from the first sample_size pages of each type (odd and even).
+    With stratified the sample is spread over the whole document instead (sample_size None uses every page),
+    analysed in workers processes and reduced with streaming medians, so memory stays constant.
     """
+    if stratified:
+        return calculate_stratified_crop_box(doc, sample_size, workers, cache)
+
     even_pages = []
     odd_pages = []
     
     for page_num in range(min(sample_size, doc.page_count)):
         page = doc[page_num]
-        bbox = extract_main_text_bbox(page)
+        bbox = extract_main_text_bbox(page, cache)
         if bbox:
             if page_num % 2 == 0:
                 even_pages.append(bbox)
@@ -76,12 +85,34 @@ def calculate_consistent_crop_box(doc, sample_size=30):
 
     return even_crop_box, odd_crop_box
 
-def crop_pdf_to_uniform_text_area(pdf_path, output_path):
+def calculate_stratified_crop_box(doc, sample_size=None, workers=1, cache=None):
+    page_numbers = stratified_sample(doc.page_count, sample_size)
+    if workers > 1:
+        bboxes = map_pages(doc.name, page_bbox, page_numbers, workers, cache=cache)
+    else:
+        bboxes = (page_bbox(doc[page_num], cache) for page_num in page_numbers)
+
+    medians = (StreamingMedianBox(), StreamingMedianBox())  # Even and odd pages
+    for page_num, bbox in zip(page_numbers, bboxes):
+        if bbox:
+            medians[page_num % 2].add(bbox)
+
+    # Report how far the estimates from two interleaved half-samples drift apart
+    for name, median in zip(("Even", "Odd"), medians):
+        spread = median.spread()
+        stability = f"half-samples differ by up to {spread:.2f}pt" if spread is not None else "too few pages to judge stability"
+        print(f"{name} pages: {median.count} sampled, {stability}")
+
+    return medians[0].box(), medians[1].box()
+
+def crop_pdf_to_uniform_text_area(pdf_path, output_path, sample_size=30, stratified=False, workers=1, use_cache=False):
     """
     Processes the PDF to crop all pages to a uniform central text area determined from the median of sample pages.
+    With use_cache, word boxes are kept on disk so re-runs on the same file skip text extraction.
     """
     doc = fitz.open(pdf_path)
-    even_crop_box, odd_crop_box = calculate_consistent_crop_box(doc)
+    cache = LayoutCache() if use_cache else None
+    even_crop_box, odd_crop_box = calculate_consistent_crop_box(doc, sample_size, stratified, workers, cache)
 
     for page_num in range(doc.page_count):
         page = doc[page_num]
@@ -97,7 +128,8 @@ def crop_pdf_to_uniform_text_area(pdf_path, output_path):
     doc.save(output_path)
     doc.close()
 
-# Usage example
-pdf_path = 'input.pdf'
-output_path = 'cropped_output.pdf'
-crop_pdf_to_uniform_text_area(pdf_path, output_path)
+if __name__ == '__main__':
+    # Usage example
+    pdf_path = 'input.pdf'
+    output_path = 'cropped_output.pdf'
+    crop_pdf_to_uniform_text_area(pdf_path, output_path, use_cache=True)
@@ -1,39 +1,25 @@
 import fitz  # PyMuPDF
-import numpy as np
+from functools import partial
+from page_analysis import words_array, filter_main_text, union_boxes, map_pages, LayoutCache
 
-def extract_main_text_bbox(page, margin=3):
+def extract_main_text_bbox(page, margin=3, cache=None):
     """
     Extracts the bounding box of the main text on the page, excluding headers, footers, and footnotes,
-    and adds a margin around the text.
+    and adds a margin around the text. Word boxes come from the LayoutCache if one is given.
     """
-    words = page.get_text("words")  # Extract words as a list of (x0, y0, x1, y1, word, block_no, line_no, word_no)
-    if not words:
-        return None
+    boxes = words_array(page, cache)  # One row of x0, y0, x1, y1 per word
+    if len(boxes) == 0:
+        return None  # Return if no text was detected
 
     # Define margins for headers and footers (percentage of page height)
     top_margin = 0.1  # 10% of the page height for header
     bottom_margin = 0.1  # 10% of the page height for footer
     page_height = page.rect.height
 
-    # Determine the average font height by calculating the median y1 - y0
-    heights = [y1 - y0 for x0, y0, x1, y1, *rest in words]
-    if not heights:
-        return None  # Return if no text was detected
-
-    median_height = np.median(heights)
-
-    # Initialize bounding box for the main text area
-    main_text_bbox = None
-
-    for word in words:
-        x0, y0, x1, y1 = word[:4]
-        # Only include words within the main text area and exclude small fonts (likely footnotes)
-        if y0 > page_height * top_margin and y1 < page_height * (1 - bottom_margin) and (y1 - y0) >= median_height * 0.8:
-            word_rect = fitz.Rect(x0, y0, x1, y1)
-            if main_text_bbox is None:
-                main_text_bbox = word_rect
-            else:
-                main_text_bbox |= word_rect  # Expand the bounding box to include the word
+    # Only include words within the main text area and exclude fonts smaller than 80% of the median
+    # word height (likely footnotes)
+    main_text = filter_main_text(boxes, page_height, top_margin, bottom_margin, strict=True, min_height_ratio=0.8)
+    main_text_bbox = union_boxes(main_text)
 
     if main_text_bbox:
         # Add a margin to the bounding box
@@ -56,25 +42,41 @@ def crop_page_to_text_area(page, crop_rect):
     if not crop_rect.is_empty:
         page.set_cropbox(crop_rect)
 
-def crop_pdf_to_text_area(pdf_path, output_path, margin=3):
+def page_crop_rect(page, margin=3, cache=None):
+    """
+    Returns the crop rectangle of a page as a plain tuple, so it can be sent back from a worker process.
+    """
+    main_text_bbox = extract_main_text_bbox(page, margin=margin, cache=cache)
+    return tuple(main_text_bbox) if main_text_bbox else None
+
+def crop_pdf_to_text_area(pdf_path, output_path, margin=3, workers=1, use_cache=False):
     """
     Processes the PDF to crop all pages to the central text area, excluding headers, footers, and footnotes.
     A margin is added around the cropped area.
+    With workers > 1 the pages are analysed in that many processes; the crop boxes are still applied
+    and saved here, so the output is identical to the sequential run. no_new_id keeps PyMuPDF from writing
+    a random second /ID into the trailer, so repeated runs produce the same bytes.
+    With use_cache, word boxes are kept on disk so re-runs on the same file skip text extraction.
     """
     doc = fitz.open(pdf_path)
+    cache = LayoutCache() if use_cache else None
 
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        main_text_bbox = extract_main_text_bbox(page, margin=margin)
+    if workers > 1:
+        analyse = partial(page_crop_rect, margin=margin)
+        crop_rects = map_pages(pdf_path, analyse, range(doc.page_count), workers, cache=cache)
+    else:
+        crop_rects = (page_crop_rect(doc[page_num], margin, cache) for page_num in range(doc.page_count))
 
-        if main_text_bbox:
+    for page_num, crop_rect in enumerate(crop_rects):
+        if crop_rect:
             # Crop page to the detected main text area with margin
-            crop_page_to_text_area(page, main_text_bbox)
+            crop_page_to_text_area(doc[page_num], fitz.Rect(crop_rect))
 
-    doc.save(output_path)
+    doc.save(output_path, no_new_id=True)
     doc.close()
 
-# Usage example
-pdf_path = 'input.pdf'
-output_path = 'cropped_output.pdf'
-crop_pdf_to_text_area(pdf_path, output_path, margin=3)
+if __name__ == '__main__':
+    # Usage example
+    pdf_path = 'input.pdf'
+    output_path = 'cropped_output.pdf'
+    crop_pdf_to_text_area(pdf_path, output_path, margin=3, workers=1, use_cache=True)
@@ -1,8 +1,9 @@
 import fitz  # PyMuPDF
+from page_analysis import words_array, LayoutCache
 
-def extract_main_text_bbox(page, margin=3):
-    words = page.get_text("words")  # Extract words as a list of rectangles
-    if not words:
+def extract_main_text_bbox(page, margin=3, cache=None):
+    words = words_array(page, cache)  # Extract words as rows of x0, y0, x1, y1
+    if len(words) == 0:
         return None
     # Define margins for headers and footers (percentage of page height)
     top_margin = 0.1  # 10% of the page height for header
@@ -37,11 +38,12 @@ def recreate_page_with_crop(doc, page_index, crop_rect):
     # Remove the original page
     doc.delete_page(page_index + 1)  # Remove the original page
 
-def crop_pdf_to_text_area(pdf_path, output_path, margin=3):
+def crop_pdf_to_text_area(pdf_path, output_path, margin=3, use_cache=False):
     doc = fitz.open(pdf_path)
+    cache = LayoutCache() if use_cache else None
     for page_num in reversed(range(doc.page_count)):  # Start from the last page
         page = doc.load_page(page_num)
-        main_text_bbox = extract_main_text_bbox(page, margin)
+        main_text_bbox = extract_main_text_bbox(page, margin, cache)
         if main_text_bbox:
             recreate_page_with_crop(doc, page_num, main_text_bbox)
     doc.save(output_path, garbage=4, deflate=True)
@@ -50,5 +52,5 @@ def crop_pdf_to_text_area(pdf_path, output_path, margin=3):
 # Usage example
 pdf_path = 'input.pdf'
 output_path = 'cropped_output.pdf'
-crop_pdf_to_text_area(pdf_path, output_path, margin=3)
+crop_pdf_to_text_area(pdf_path, output_path, margin=3, use_cache=True)
 
@@ -1,35 +1,49 @@
 import fitz  # PyMuPDF
 import os
 import re
-
-def apply_adjustments(doc, original_rects, adjustments, odd_offset):
-    for i, page in enumerate(doc):
-        original_rect = original_rects[i]
-        media_box = page.mediabox
+from working_copy import open_working_copy, compact
+
+def crop_rect(i, media_box, original_rect, adjustments, odd_offset):
+    # Apply the left, right, top, and bottom adjustments to both even and odd pages
+    new_rect = fitz.Rect(
+        max(media_box.x0, original_rect.x0 + adjustments['l']),
+        max(media_box.y0, original_rect.y0 + adjustments['t']),
+        min(media_box.x1, original_rect.x1 - adjustments['r']),
+        min(media_box.y1, original_rect.y1 - adjustments['b'])
+    )
+
+    # If the page is odd, additionally apply the odd page offset, but stay within MediaBox
+    if i % 2 != 0:  # Odd pages
+        new_rect = fitz.Rect(
+            max(media_box.x0, new_rect.x0 + odd_offset),  # Ensure it doesn't go past the left boundary
+            new_rect.y0,
+            min(media_box.x1, new_rect.x1 + odd_offset),  # Ensure it doesn't go past the right boundary
+            new_rect.y1
+        )
+
+    return new_rect
+
+def apply_adjustments(doc, original_rects, media_boxes, applied_rects, adjustments, odd_offset):
+    """
+    Sets the crop box only on pages whose rectangle differs from the one applied last time,
+    and returns how many pages changed.
+    """
+    changed = 0
+    for i, original_rect in enumerate(original_rects):
+        new_rect = crop_rect(i, media_boxes[i], original_rect, adjustments, odd_offset)
+        if new_rect == applied_rects[i]:
+            continue
 
         try:
-            # Apply the left, right, top, and bottom adjustments to both even and odd pages
-            new_rect = fitz.Rect(
-                max(media_box.x0, original_rect.x0 + adjustments['l']),
-                max(media_box.y0, original_rect.y0 + adjustments['t']),
-                min(media_box.x1, original_rect.x1 - adjustments['r']),
-                min(media_box.y1, original_rect.y1 - adjustments['b'])
-            )
-
-            # If the page is odd, additionally apply the odd page offset, but stay within MediaBox
-            if i % 2 != 0:  # Odd pages
-                new_rect = fitz.Rect(
-                    max(media_box.x0, new_rect.x0 + odd_offset),  # Ensure it doesn't go past the left boundary
-                    new_rect.y0,
-                    min(media_box.x1, new_rect.x1 + odd_offset),  # Ensure it doesn't go past the right boundary
-                    new_rect.y1
-                )
-
             # Apply the new crop box, but ensure the values stay within the MediaBox limits
-            page.set_cropbox(new_rect)
+            doc[i].set_cropbox(new_rect)
+            applied_rects[i] = new_rect
+            changed += 1
         except ValueError as e:
             print(f"Warning: Could not apply adjustments to page {i+1}. Error: {e}")
 
+    return changed
+
 def process_input(command, adjustments, odd_offset):
     match = re.match(r"([lrtbo])([-+]?\d*\.?\d+)", command)
     if not match:
@@ -56,10 +70,13 @@ def main():
             print(f"File '{pdf_path}' does not exist. Please enter a valid file path.")
             continue
         
-        doc = fitz.open(pdf_path)
         break
 
+    new_file_path = pdf_path.replace('.pdf', '_cropped.pdf')
+    doc = open_working_copy(pdf_path, new_file_path)
     original_rects = [page.rect for page in doc]
+    media_boxes = [page.mediabox for page in doc]
+    applied_rects = [None] * doc.page_count
     adjustments = {'l': 0, 'r': 0, 't': 0, 'b': 0}
     odd_offset = 0
 
@@ -71,15 +88,16 @@ def main():
         # Use the new process_input function to interpret and update adjustments
         adjustments, odd_offset = process_input(command, adjustments, odd_offset)
 
-        # Apply the adjustments after every command
-        apply_adjustments(doc, original_rects, adjustments, odd_offset)
+        # Apply the adjustments after every command, touching only the pages whose crop box changed
+        changed = apply_adjustments(doc, original_rects, media_boxes, applied_rects, adjustments, odd_offset)
+        if not changed:
+            continue
 
-        # Save changes to a new file
-        new_file_path = pdf_path.replace('.pdf', '_cropped.pdf')
-        doc.save(new_file_path)
-        print(f"Changes saved to {new_file_path}")
+        # Append the changed pages to the output file
+        doc.save(new_file_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        print(f"Changes to {changed} page(s) saved to {new_file_path}")
 
-    doc.close()
+    compact(doc, new_file_path)
 
 if __name__ == "__main__":
     main()
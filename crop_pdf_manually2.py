@@ -1,44 +1,18 @@
 import fitz  # PyMuPDF
 import os
 import re
+import time
 
-def apply_adjustments(doc, original_rects, adjustments, odd_offset):
+def compute_rects(doc, original_rects, adjustments, odd_offset):
+    """
+    Computes the adjusted cropping rectangle of every page once, for both applying and exporting.
+    """
+    rects = []
     for i, page in enumerate(doc):
         original_rect = original_rects[i]
         media_box = page.mediabox
 
-        try:
-            # Apply the left, right, top, and bottom adjustments to both even and odd pages
-            new_rect = fitz.Rect(
-                max(media_box.x0, original_rect.x0 + adjustments['l']),
-                max(media_box.y0, original_rect.y0 + adjustments['t']),
-                min(media_box.x1, original_rect.x1 - adjustments['r']),
-                min(media_box.y1, original_rect.y1 - adjustments['b'])
-            )
-
-            # If the page is odd, apply the odd page offset, but stay within MediaBox
-            if i % 2 != 0:  # Odd pages
-                new_rect = fitz.Rect(
-                    max(media_box.x0, new_rect.x0 + odd_offset),  # Ensure it doesn't go past the left boundary
-                    new_rect.y0,
-                    min(media_box.x1, new_rect.x1 + odd_offset),  # Ensure it doesn't go past the right boundary
-                    new_rect.y1
-                )
-
-            # Ensure the values stay within the MediaBox limits
-            page.set_cropbox(new_rect)
-
-        except ValueError as e:
-            print(f"Warning: Could not apply adjustments to page {i+1}. Error: {e}")
-
-def extract_and_save(doc, original_rects, adjustments, odd_offset, output_file):
-    new_doc = fitz.open()
-    
-    for i, page in enumerate(doc):
-        original_rect = original_rects[i]
-        media_box = page.mediabox
-
-        # Create a new cropping rectangle using the adjusted values
+        # Apply the left, right, top, and bottom adjustments to both even and odd pages
         new_rect = fitz.Rect(
             max(media_box.x0, original_rect.x0 + adjustments['l']),
             max(media_box.y0, original_rect.y0 + adjustments['t']),
@@ -46,22 +20,45 @@ def extract_and_save(doc, original_rects, adjustments, odd_offset, output_file):
             min(media_box.y1, original_rect.y1 - adjustments['b'])
         )
 
-        # Apply odd page offset if it's an odd page
-        if i % 2 != 0:
+        # If the page is odd, apply the odd page offset, but stay within MediaBox
+        if i % 2 != 0:  # Odd pages
             new_rect = fitz.Rect(
-                max(media_box.x0, new_rect.x0 + odd_offset),
+                max(media_box.x0, new_rect.x0 + odd_offset),  # Ensure it doesn't go past the left boundary
                 new_rect.y0,
-                min(media_box.x1, new_rect.x1 + odd_offset),
+                min(media_box.x1, new_rect.x1 + odd_offset),  # Ensure it doesn't go past the right boundary
                 new_rect.y1
             )
 
+        rects.append(new_rect)
+    return rects
+
+def apply_adjustments(doc, rects):
+    for i, page in enumerate(doc):
+        try:
+            # Ensure the values stay within the MediaBox limits
+            page.set_cropbox(rects[i])
+
+        except ValueError as e:
+            print(f"Warning: Could not apply adjustments to page {i+1}. Error: {e}")
+
+def extract_and_save(doc, rects, output_file):
+    """
+    Builds the cropped document in one pass. All pages are shown into the same new document, so
+    PyMuPDF grafts each shared font or image from the source only once; garbage collection with
+    deduplication and compression then drops whatever is left unreferenced or duplicated.
+    """
+    start = time.perf_counter()
+    new_doc = fitz.open()
+
+    for i, new_rect in enumerate(rects):
         # Create a new page with the cropped content and discard the rest
         cropped_page = new_doc.new_page(width=new_rect.width, height=new_rect.height)
-        cropped_page.show_pdf_page(new_rect, doc, i)
+        cropped_page.show_pdf_page(cropped_page.rect, doc, i)
 
-    new_doc.save(output_file)
+    new_doc.save(output_file, garbage=4, deflate=True, deflate_images=True, deflate_fonts=True)
     new_doc.close()
-    print(f"New file saved as {output_file}")
+    size = os.path.getsize(output_file)
+    print(f"New file saved as {output_file} ({size / 1024:.0f} KiB in {time.perf_counter() - start:.2f}s)")
 
 def process_input(command, adjustments, odd_offset):
     match = re.match(r"([lrtbo])([-+]?\d*\.?\d+)", command)
@@ -105,11 +102,12 @@ def main():
         adjustments, odd_offset = process_input(command, adjustments, odd_offset)
 
         # Apply adjustments to the visible content
-        apply_adjustments(doc, original_rects, adjustments, odd_offset)
+        rects = compute_rects(doc, original_rects, adjustments, odd_offset)
+        apply_adjustments(doc, rects)
 
         # Extract the cropped content and save to a new file, removing hidden areas
         new_file_path = pdf_path.replace('.pdf', '_cropped_removed.pdf')
-        extract_and_save(doc, original_rects, adjustments, odd_offset, new_file_path)
+        extract_and_save(doc, rects, new_file_path)
 
     doc.close()
 
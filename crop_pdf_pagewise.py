@@ -1,12 +1,19 @@
 import fitz  # PyMuPDF
 import os
 import re
+from working_copy import open_working_copy, compact
 
 # Store adjustments per page in a dictionary
 page_adjustments = {}
 
-def apply_adjustments(doc, original_rects):
-    for i, page in enumerate(doc):
+def apply_adjustments(doc, original_rects, pages):
+    """
+    Updates the crop box of the given pages only; the others keep whatever was applied before.
+    """
+    for i in sorted(pages):
+        if i >= doc.page_count:
+            continue
+        page = doc[i]
         original_rect = original_rects[i]
         media_box = page.mediabox
 
@@ -28,11 +35,14 @@ def apply_adjustments(doc, original_rects):
             print(f"Warning: Could not apply adjustments to page {i+1}. Error: {e}")
 
 def process_input(command):
+    """
+    Updates page_adjustments and returns the index of the page that changed, or None.
+    """
     # Match the input command structure (e.g., '5r4' where 5 is page, r is right margin, 4 is adjustment)
     match = re.match(r"(\d+)([lrtb])([-+]?\d*\.?\d+)", command)
     if not match:
         print("Invalid command format. Use '5r4' for page 5, right margin +4.")
-        return
+        return None
 
     page_num = int(match.group(1)) - 1  # Page numbers are 0-indexed
     margin_side = match.group(2)
@@ -40,13 +50,14 @@ def process_input(command):
 
     if page_num < 0:
         print("Invalid page number.")
-        return
+        return None
 
     # Update adjustments for the specific page
     if page_num not in page_adjustments:
         page_adjustments[page_num] = {'l': 0, 'r': 0, 't': 0, 'b': 0}
 
     page_adjustments[page_num][margin_side] += value
+    return page_num
 
 def main():
     while True:
@@ -56,9 +67,10 @@ def main():
             print(f"File '{pdf_path}' does not exist. Please enter a valid file path.")
             continue
         
-        doc = fitz.open(pdf_path)
         break
 
+    new_file_path = pdf_path.replace('.pdf', '_cropped.pdf')
+    doc = open_working_copy(pdf_path, new_file_path)
     original_rects = [page.rect for page in doc]
 
     while True:
@@ -66,15 +78,16 @@ def main():
         if command == 'exit':
             break
 
-        process_input(command)
-        apply_adjustments(doc, original_rects)
+        page_num = process_input(command)
+        if page_num is None or page_num >= doc.page_count:
+            continue
+        apply_adjustments(doc, original_rects, {page_num})
 
-        # Save changes to a new file
-        new_file_path = pdf_path.replace('.pdf', '_cropped.pdf')
-        doc.save(new_file_path)
+        # Append only the changed page to the output file
+        doc.save(new_file_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
         print(f"Changes saved to {new_file_path}")
 
-    doc.close()
+    compact(doc, new_file_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,36 +1,59 @@
 import fitz  # PyMuPDF
+import numpy as np
+from page_analysis import blocks_array, LayoutCache
 
-def find_footnote_start(page):
+SIGNIFICANT_GAP = 20  # Gaps at least this tall (pt) are taken to separate body text and footnotes
+FOOTNOTE_REGION = 0.5  # Footnote rules are only searched for below this fraction of the page height
+
+def find_largest_gap(text_blocks, page_height):
+    """
+    Returns (max_gap, y0 of the block below it) for the largest vertical gap between successive blocks,
+    given as an (n, 4) array of block boxes.
+    """
+    if len(text_blocks) == 0:
+        return 0, page_height
+    boxes = text_blocks
+    # Gap above every block, measured from the bottom of the block before it (the first from the page top)
+    gaps = boxes[:, 1] - np.concatenate(([0.0], boxes[:-1, 3]))
+    index = int(np.argmax(gaps))
+    if gaps[index] <= 0:
+        return 0, page_height
+    return float(gaps[index]), float(boxes[index, 1])
+
+def find_footnote_start(page, cache=None):
     """Attempts to find the start of the footnotes based on text block positions or lines."""
-    text_blocks = page.get_text("blocks")
-    last_y = 0
-    max_gap = 0
-    footnote_y_start = page.rect.height
+    text_blocks = blocks_array(page, cache)
 
     # Find the largest vertical gap between successive text blocks, assuming it might indicate start of footnotes
-    for block in text_blocks:
-        rect = fitz.Rect(block[:4])
-        if rect.y0 - last_y > max_gap:
-            max_gap = rect.y0 - last_y
-            footnote_y_start = rect.y0
-        last_y = rect.y1
+    max_gap, footnote_y_start = find_largest_gap(text_blocks, page.rect.height)
 
-    # Optionally check for lines if no significant gap found
-    if max_gap < 20:  # Threshold for deciding if a gap is 'significant'
-        lines = page.get_drawings()
-        for line in lines:
-            if line['width'] > page.rect.width * 0.8 and line['items'][0]['rect'].y0 < footnote_y_start:  # Assumption that line width covers most of the page width
-                footnote_y_start = line['items'][0]['rect'].y0
+    # A significant gap is decisive, so the expensive drawings scan is skipped
+    if max_gap >= SIGNIFICANT_GAP:
+        return footnote_y_start
+
+    # Otherwise look for a wide separator rule in the lower part of the page above the current guess.
+    # The bbox log still covers the whole page, but it only reports the bounding box of each drawing,
+    # so it is far cheaper than building every path with get_drawings; the region is filtered afterwards.
+    region_top = page.rect.height * FOOTNOTE_REGION
+    if region_top >= footnote_y_start:
+        return footnote_y_start
+    for kind, bbox in page.get_bboxlog():
+        if kind not in ('fill-path', 'stroke-path'):
+            continue
+        rect = fitz.Rect(bbox)
+        if rect.width > page.rect.width * 0.8 and region_top <= rect.y0 < footnote_y_start:  # Assumption that line width covers most of the page width
+            footnote_y_start = rect.y0
 
     return footnote_y_start
 
-def remove_footnotes(pdf_path):
+def remove_footnotes(pdf_path, use_cache=False):
     doc = fitz.open(pdf_path)
+    cache = LayoutCache() if use_cache else None
     new_file_path = pdf_path.replace('.pdf', '_no_footnotes.pdf')
 
     for page in doc:
         # Find the y-coordinate to start cropping (remove footnotes)
-        footnote_y_start = find_footnote_start(page)
+        footnote_y_start = find_footnote_start(page, cache)
         new_crop = fitz.Rect(0, 0, page.rect.width, footnote_y_start)
         page.set_cropbox(new_crop)
 
@@ -40,4 +63,4 @@ def remove_footnotes(pdf_path):
 
 if __name__ == "__main__":
     pdf_path = input("Enter the full path to the PDF file: ")
-    remove_footnotes(pdf_path)
+    remove_footnotes(pdf_path, use_cache=True)
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+#SQLite plumbing shared by the on-disk caches of the OCR scripts, the croppers and the text extractor
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'crop-pdf')
+
+class SQLiteCache:
+    """
+    One SQLite file under cache_dir, created with the statements in SCHEMA on first use.
+    The connection is opened lazily and left out when the cache is pickled, so a cache can be handed
+    to worker processes; each process then opens its own connection.
+    """
+    SCHEMA = ()
+
+    def __init__(self, filename, cache_dir=DEFAULT_CACHE_DIR):
+        self.path = os.path.join(cache_dir, filename)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_connection=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+        return self._connection
@@ -1,27 +1,97 @@
-import fitz
-import sys
+import argparse
+import json
 import os
+import sys
+from collections import Counter
+import fitz
+from disk_cache import SQLiteCache, DEFAULT_CACHE_DIR
 
-def extract_text(pdf_file):
-    # Open the PDF file
-    doc = fitz.open(pdf_file)
-    full_text = ""
-    previous_block = None
-    previous_line = None
-    for page_num in range(doc.page_count):
-        page = doc.load_page(page_num)
-        blocks = page.get_text("dict")["blocks"]
+# Text-only extraction: image blocks are neither decoded nor stored in the text page
+LEAN_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+class FontStatsCache(SQLiteCache):
+    """
+    On-disk character count per span size of every document extracted, keyed by path, size and mtime,
+    so the headline threshold of an unchanged file is known before its text is extracted.
+    """
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS font_sizes (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, sizes TEXT)",)
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        super().__init__('font_sizes.sqlite', cache_dir)
+
+    def get(self, pdf_file):
+        stat = os.stat(pdf_file)
+        with self._lock:
+            row = self.connection.execute("SELECT size, mtime, sizes FROM font_sizes WHERE path = ?",
+                                          (os.path.abspath(pdf_file),)).fetchone()
+        if row is None or tuple(row[:2]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return Counter({float(size): count for size, count in json.loads(row[2]).items()})
+
+    def put(self, pdf_file, sizes):
+        stat = os.stat(pdf_file)
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO font_sizes VALUES (?, ?, ?, ?)",
+                                    (os.path.abspath(pdf_file), stat.st_size, stat.st_mtime_ns, json.dumps(sizes)))
+
+def compact_blocks(blocks):
+    """Keep only what the extractor uses: text blocks as lines of (size, stripped text) spans, other blocks as None."""
+    return [
+        [[(span['size'], span['text'].strip()) for span in line["spans"]] for line in block["lines"]]
+        if block['type'] == 0 else None
+        for block in blocks
+    ]
+
+def page_blocks(page, lean=False):
+    """
+    Return the compact blocks of a page.
+    With lean, image blocks are kept out of the dict so their image data is never produced. An image block
+    still ends its own block in the output and splits the text around it, so the text-only blocks are only
+    used when they line up with the text blocks of the full layout; otherwise the full dict is used.
+    Either way the result is the same as without lean.
+    """
+    if not lean:
+        return compact_blocks(page.get_text("dict")["blocks"])
+    textpage = page.get_textpage(flags=fitz.TEXTFLAGS_DICT)
+    layout = page.get_text("blocks", textpage=textpage)
+    if all(block[6] == 0 for block in layout):
+        return compact_blocks(page.get_text("dict", textpage=textpage)["blocks"])
+    text_blocks = page.get_text("dict", flags=LEAN_FLAGS)["blocks"]
+    text_layout = [block[:4] for block in layout if block[6] == 0]
+    lined_up = len(text_layout) == len(text_blocks) and all(
+        max(abs(a - b) for a, b in zip(rect, block['bbox'])) < 0.5 for rect, block in zip(text_layout, text_blocks))
+    if not lined_up:
+        return compact_blocks(page.get_text("dict", textpage=textpage)["blocks"])
+    text_blocks = iter(compact_blocks(text_blocks))
+    return [next(text_blocks) if block[6] == 0 else None for block in layout]
 
+def count_sizes(blocks, sizes):
+    """Add the characters of every span of the compact blocks to the per-size histogram."""
+    for block in blocks:
+        if block is not None:
+            for line in block:
+                for size, text in line:
+                    sizes[round(size, 1)] += len(text)
+
+def threshold_from_sizes(sizes, ratio=1.15):
+    """Spans larger than this are headlines: the body size (the size most characters use) times ratio."""
+    if not sizes:
+        return 12
+    body_size = sizes.most_common(1)[0][0]
+    return body_size * ratio
+
+def emit_text(pages, headline_size):
+    """Yield the text fragments of an iterable of pages of compact blocks."""
+    previous_line = None
+    for blocks in pages:
         for block in blocks:
-            if block['type'] == 0:  # Process only text blocks
-                for line in block["lines"]:
+            if block is not None:  # Process only text blocks
+                for line in block:
                     current_line = ""
-                    for span in line["spans"]:
-                        text = span['text'].strip()  # Remove unnecessary spaces
-
+                    for size, text in line:
                         # Check if the span is a headline (based on font size)
-                        if span['size'] > 12:  # Adjust as needed for headline detection
-                            full_text += f"\n<H1>{text}</H1>\n"
+                        if size > headline_size:
+                            yield f"\n<H1>{text}</H1>\n"
                         else:
                             # If we have a previous line, check for space handling
                             if previous_line:
@@ -29,34 +99,70 @@ def extract_text(pdf_file):
                                 if not previous_line.endswith("-"):
                                     current_line += " "
                             current_line += text
-                    
-                    # Add the processed line to the full text
-                    full_text += current_line
+
+                    # Emit the processed line
+                    yield current_line
                     previous_line = current_line  # Keep track of the last processed line
 
-            full_text += "\n"  # Newline after each block for clean separation
+            yield "\n"  # Newline after each block for clean separation
+
+def iter_text(pdf_file, lean=False, headline_size=12, cache=None):
+    """
+    Yield the extracted text fragment by fragment, one page at a time.
+    With lean, image data is not produced where that cannot change the output (see page_blocks).
+    headline_size='auto' derives the headline threshold from the document's own font sizes instead of the
+    fixed 12pt. The size histogram is collected during the extraction pass and stored in the FontStatsCache,
+    if given; a later run on the unchanged file streams from the start. Without a stored histogram,
+    'auto' has to hold the compact spans of the whole document until the threshold is known.
+    """
+    sizes = Counter()
 
-    doc.close()
-    return full_text
+    def counted(pages):
+        for blocks in pages:
+            count_sizes(blocks, sizes)
+            yield blocks
+
+    with fitz.open(pdf_file) as doc:
+        pages = (page_blocks(page, lean) for page in doc)
+        known = cache.get(pdf_file) if cache else None
+        if headline_size == 'auto' and known is None:
+            pages = list(counted(pages))
+            headline_size = threshold_from_sizes(sizes)
+        elif headline_size == 'auto':
+            headline_size = threshold_from_sizes(known)
+        elif known is None:
+            pages = counted(pages)
+        yield from emit_text(pages, headline_size)
+    if cache and known is None:
+        cache.put(pdf_file, sizes)
+
+def extract_text(pdf_file, lean=False, headline_size=12, cache=None):
+    return "".join(iter_text(pdf_file, lean, headline_size, cache))
 
 def save_to_file(text, output_file):
-    # Write the extracted text to the output file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(text)
+    # Write the extracted text (a string or an iterable of fragments) through a large write buffer
+    with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as f:
+        if isinstance(text, str):
+            f.write(text)
+        else:
+            f.writelines(text)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <pdf_file>")
-        sys.exit(1)
-    
-    pdf_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Extract the text of a PDF with <H1> tags for headlines.")
+    parser.add_argument('pdf_file')
+    parser.add_argument('--lean', action='store_true', help="Do not produce image data while extracting")
+    parser.add_argument('--headline-size', default='12',
+                        help="Font size above which spans are headlines, or 'auto' to derive it from the document")
+    args = parser.parse_args()
+
+    pdf_file = args.pdf_file
     
     if not os.path.exists(pdf_file):
         print(f"Error: File '{pdf_file}' not found!")
         sys.exit(1)
 
+    headline_size = args.headline_size if args.headline_size == 'auto' else float(args.headline_size)
     output_file = f"{os.path.splitext(pdf_file)[0]}_output.txt"
-    text = extract_text(pdf_file)
-    save_to_file(text, output_file)
+    save_to_file(iter_text(pdf_file, args.lean, headline_size, FontStatsCache()), output_file)
     
     print(f"Text extracted and saved to '{output_file}'")
@@ -1,31 +1,22 @@
 import pytesseract #pip install pytesseract #sudo apt-get install tesseract-ocr
-import fitz  # PyMuPDF
-from PIL import Image
-import io
+import os
 import re
 import textwrap
+from ocr_common import pixmap_to_image, ocr_pipeline, ocr_pool, OCRCache
+from ocr_common import data_to_text, mean_confidence, LOW_DPI, HIGH_DPI, MIN_CONFIDENCE
 
 # Ensure pytesseract is configured correctly (modify path if necessary)
 # pytesseract.pytesseract.tesseract_cmd = r'/path/to/tesseract'
 
-def pdf_to_images(pdf_path):
-    """Convert PDF pages to images."""
-    pdf_document = fitz.open(pdf_path)
-    images = []
-    
-    for page_number in range(len(pdf_document)):
-        page = pdf_document.load_page(page_number)
-        pix = page.get_pixmap()
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-        images.append(img)
-    
-    return images
+# Set custom configurations: English language
+LANGUAGE = 'eng'
+CUSTOM_CONFIG = r'--psm 3'  # Adjusting for single block of text, suitable for books. Tried: 3, 6, 1, 4
+# Everything besides the rendered pixels that changes the raw OCR output
+OCR_CACHE_CONFIG = f"lang={LANGUAGE} {CUSTOM_CONFIG} preprocessing=none"
 
 def extract_text_from_image(image):
     """Extract text from a given image using pytesseract with custom configurations."""
-    # Set custom configurations: English language
-    custom_config = r'--psm 3'  # Adjusting for single block of text, suitable for books. Tried: 3, 6, 1, 4
-    text = pytesseract.image_to_string(image, lang='eng', config=custom_config)
+    text = pytesseract.image_to_string(image, lang=LANGUAGE, config=CUSTOM_CONFIG)
     return text
 
 def clean_text(text):
@@ -41,26 +32,51 @@ def clean_text(text):
     
     return cleaned_text
 
-def save_text_to_file(text, output_file):
-    """Save the cleaned text to a TXT file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(text)
-
-def pdf_to_text(pdf_path, txt_output_path):
-    """Main function to convert PDF to text with headline tagging and cleaned line breaks."""
-    images = pdf_to_images(pdf_path)
-    all_text = ""
-
-    for img in images:
-        text = extract_text_from_image(img)
-        cleaned_text = clean_text(text)
-        all_text += cleaned_text + "\n\n"
+def ocr_pixmap(pix):
+    """OCR one rendered page; runs inside the ocr_pool worker processes."""
+    return extract_text_from_image(pixmap_to_image(pix))
 
-    save_text_to_file(all_text, txt_output_path)
+def ocr_pixmap_with_confidence(pix):
+    """Like ocr_pixmap, but returns (text, mean word confidence) for the adaptive mode."""
+    data = pytesseract.image_to_data(pixmap_to_image(pix), lang=LANGUAGE, config=CUSTOM_CONFIG,
+                                     output_type=pytesseract.Output.DICT)
+    return data_to_text(data), mean_confidence(data)
 
-# Example usage
-pdf_path = "cropped_output_individual.pdf"  # Replace with your PDF path
-txt_output_path = "output_tesseract.txt"  # Replace with your desired TXT output path
+def pdf_to_text(pdf_path, txt_output_path, workers=1, hybrid=False, use_cache=False, dpi=None, region='page',
+                adaptive=False, colorspace='rgb'):
+    """
+    Main function to convert PDF to text with headline tagging and cleaned line breaks.
+    With hybrid, pages that already have a usable text layer are read directly instead of OCR'd.
+    With use_cache, raw OCR output is kept on disk and reused for pages whose pixels did not change.
+    region='text' renders only the detected text area, and dpi='auto' sizes each render for tesseract.
+    With adaptive, pages are OCR'd at LOW_DPI first and only those read with low confidence again at a higher
+    resolution; the dpi and confidence of every page are written next to the text as <name>.ocr.tsv.
+    dpi defaults to 72, or LOW_DPI in adaptive mode. colorspace is 'rgb' or 'gray', as for render_page.
+    """
+    if adaptive:
+        dpi = dpi or LOW_DPI
+        # Only the final text is cached, under the first pass pixels; key it on the retry settings too
+        cache = OCRCache(f"{OCR_CACHE_CONFIG} adaptive={MIN_CONFIDENCE}@{HIGH_DPI}") if use_cache else None
+        report_path = os.path.splitext(txt_output_path)[0] + '.ocr.tsv'
+        # The retry needs the page itself, so this always runs through the worker pool
+        ocr_pool(pdf_path, txt_output_path, ocr_pixmap_with_confidence, clean_text, max(1, workers), dpi=dpi,
+                 colorspace=colorspace, hybrid=hybrid, cache=cache, region=region, min_confidence=MIN_CONFIDENCE,
+                 report_path=report_path)
+        return
+    dpi = dpi or 72
+    cache = OCRCache(OCR_CACHE_CONFIG) if use_cache else None
+    if workers > 1:
+        # Pages are rendered and OCR'd in separate processes, then written in page order
+        ocr_pool(pdf_path, txt_output_path, ocr_pixmap, clean_text, workers, dpi=dpi, colorspace=colorspace,
+                 hybrid=hybrid, cache=cache, region=region)
+    else:
+        # Render, OCR and clean overlap page by page; each page is written as soon as it is done
+        ocr_pipeline(pdf_path, txt_output_path, pixmap_to_image, extract_text_from_image, clean_text, dpi=dpi,
+                     colorspace=colorspace, hybrid=hybrid, cache=cache, region=region)
 
-pdf_to_text(pdf_path, txt_output_path)
+if __name__ == "__main__":
+    # Example usage
+    pdf_path = "cropped_output_individual.pdf"  # Replace with your PDF path
+    txt_output_path = "output_tesseract.txt"  # Replace with your desired TXT output path
 
+    pdf_to_text(pdf_path, txt_output_path, workers=os.cpu_count(), hybrid=False, use_cache=True)
@@ -1,43 +1,63 @@
 import pytesseract #pip install pytesseract #sudo apt-get install tesseract-ocr
-import fitz  # PyMuPDF
 from PIL import Image
-import io
+import os
 import re
 import textwrap
 import cv2
 import numpy as np
+from ocr_common import pixmap_to_array, ocr_pipeline, ocr_pool, OCRCache
+from ocr_common import data_to_text, mean_confidence, LOW_DPI, HIGH_DPI, MIN_CONFIDENCE
 
 # Ensure pytesseract is configured correctly (modify path if necessary)
 # pytesseract.pytesseract.tesseract_cmd = r'/path/to/tesseract'
 
-def pdf_to_images(pdf_path):
-    """Convert PDF pages to images."""
-    pdf_document = fitz.open(pdf_path)
-    images = []
-    
-    for page_number in range(len(pdf_document)):
-        page = pdf_document.load_page(page_number)
-        pix = page.get_pixmap()
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-        images.append(img)
-    
-    return images
+LANGUAGE = 'eng'
+CUSTOM_CONFIG = r'--psm 11'  # Sparse text mode might work better
+# Everything besides the rendered pixels that changes the raw OCR output; bump when preprocessing changes
+OCR_CACHE_CONFIG = f"lang={LANGUAGE} {CUSTOM_CONFIG} preprocessing=binarize+deskew/1"
+
+SKEW_TOLERANCE = 0.1  # Degrees; pages skewed less than this are not rotated
+SKEW_SAMPLE_SIZE = 1000  # Longest side, in pixels, of the subsampled page the skew is estimated on
+SKEW_MAX_ERROR = 0.25  # Degrees; stated bound between estimate_skew and the full-resolution estimate
+
+def skew_angle(coords):
+    """Rotation that straightens the minimum-area rectangle around the given (row, column) coordinates."""
+    if len(coords) == 0:
+        return 0.0
+    angle = cv2.minAreaRect(coords.astype(np.int32))[-1]
+    # OpenCV 4.5.1+ reports angles in (0, 90] instead of [-90, 0); map them back before converting
+    if angle > 0:
+        angle -= 90
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+    return angle
+
+def estimate_skew(binary, sample_size=SKEW_SAMPLE_SIZE):
+    """
+    Estimate the skew on a strided subsample of the binary page instead of on every foreground pixel.
+    Subsampling keeps the geometry, so the angle stays within SKEW_MAX_ERROR of the full-resolution one
+    while collecting a fraction of the coordinates.
+    """
+    step = max(1, -(-max(binary.shape[:2]) // sample_size))
+    sample = binary[::step, ::step]
+    return skew_angle(np.column_stack(np.where(sample > 0)))
 
 def preprocess_image(image):
     """Preprocess the image for better OCR results (binarization and deskewing)."""
-    # Convert to grayscale
-    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    # Convert to grayscale (images rendered in gray already are)
+    gray = np.asarray(image)
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
     
     # Binarize the image (thresholding)
     _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
 
-    # Deskew the image
-    coords = np.column_stack(np.where(binary > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
+    # Deskew the image, unless it is already straight enough
+    angle = estimate_skew(binary)
+    if abs(angle) < SKEW_TOLERANCE:
+        return Image.fromarray(binary)
 
     (h, w) = binary.shape[:2]
     center = (w // 2, h // 2)
@@ -46,12 +66,18 @@ def preprocess_image(image):
     
     return Image.fromarray(deskewed)
 
+def preprocess_pixmap(pix):
+    """Preprocess a rendered page straight from its pixmap samples."""
+    return preprocess_image(pixmap_to_array(pix))
+
+def ocr_preprocessed_image(preprocessed_image):
+    """Run pytesseract with custom configurations on an already preprocessed image."""
+    text = pytesseract.image_to_string(preprocessed_image, lang=LANGUAGE, config=CUSTOM_CONFIG)
+    return text
+
 def extract_text_from_image(image):
     """Extract text from a given image using pytesseract with custom configurations."""
-    preprocessed_image = preprocess_image(image)
-    custom_config = r'--psm 11'  # Sparse text mode might work better
-    text = pytesseract.image_to_string(preprocessed_image, lang='eng', config=custom_config)
-    return text
+    return ocr_preprocessed_image(preprocess_image(image))
 
 def clean_text(text):
     """Remove unnecessary line breaks and tag headlines."""
@@ -66,25 +92,51 @@ def clean_text(text):
     
     return cleaned_text
 
-def save_text_to_file(text, output_file):
-    """Save the cleaned text to a TXT file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(text)
+def ocr_pixmap(pix):
+    """Preprocess and OCR one rendered page; runs inside the ocr_pool worker processes."""
+    return ocr_preprocessed_image(preprocess_pixmap(pix))
 
-def pdf_to_text(pdf_path, txt_output_path):
-    """Main function to convert PDF to text with headline tagging and cleaned line breaks."""
-    images = pdf_to_images(pdf_path)
-    all_text = ""
+def ocr_pixmap_with_confidence(pix):
+    """Like ocr_pixmap, but returns (text, mean word confidence) for the adaptive mode."""
+    data = pytesseract.image_to_data(preprocess_pixmap(pix), lang=LANGUAGE, config=CUSTOM_CONFIG,
+                                     output_type=pytesseract.Output.DICT)
+    return data_to_text(data), mean_confidence(data)
 
-    for img in images:
-        text = extract_text_from_image(img)
-        cleaned_text = clean_text(text)
-        all_text += cleaned_text + "\n\n"
-
-    save_text_to_file(all_text, txt_output_path)
+def pdf_to_text(pdf_path, txt_output_path, workers=1, hybrid=False, use_cache=False, dpi=None, region='page',
+                adaptive=False, colorspace='rgb'):
+    """
+    Main function to convert PDF to text with headline tagging and cleaned line breaks.
+    With hybrid, pages that already have a usable text layer are read directly instead of OCR'd.
+    With use_cache, raw OCR output is kept on disk and reused for pages whose pixels did not change.
+    region='text' renders only the detected text area, and dpi='auto' sizes each render for tesseract.
+    With adaptive, pages are OCR'd at LOW_DPI first and only those read with low confidence again at a higher
+    resolution; the dpi and confidence of every page are written next to the text as <name>.ocr.tsv.
+    dpi defaults to 72, or LOW_DPI in adaptive mode. colorspace is 'rgb' or 'gray', as for render_page.
+    """
+    if adaptive:
+        dpi = dpi or LOW_DPI
+        # Only the final text is cached, under the first pass pixels; key it on the retry settings too
+        cache = OCRCache(f"{OCR_CACHE_CONFIG} adaptive={MIN_CONFIDENCE}@{HIGH_DPI}") if use_cache else None
+        report_path = os.path.splitext(txt_output_path)[0] + '.ocr.tsv'
+        # The retry needs the page itself, so this always runs through the worker pool
+        ocr_pool(pdf_path, txt_output_path, ocr_pixmap_with_confidence, clean_text, max(1, workers), dpi=dpi,
+                 colorspace=colorspace, hybrid=hybrid, cache=cache, region=region, min_confidence=MIN_CONFIDENCE,
+                 report_path=report_path)
+        return
+    dpi = dpi or 72
+    cache = OCRCache(OCR_CACHE_CONFIG) if use_cache else None
+    if workers > 1:
+        # Pages are rendered and OCR'd in separate processes, then written in page order
+        ocr_pool(pdf_path, txt_output_path, ocr_pixmap, clean_text, workers, dpi=dpi, colorspace=colorspace,
+                 hybrid=hybrid, cache=cache, region=region)
+    else:
+        # Render, preprocess, OCR and clean overlap page by page; each page is written as soon as it is done
+        ocr_pipeline(pdf_path, txt_output_path, preprocess_pixmap, ocr_preprocessed_image, clean_text, dpi=dpi,
+                     colorspace=colorspace, hybrid=hybrid, cache=cache, region=region)
 
-# Example usage
-pdf_path = "cropped_output_individual.pdf"  # Replace with your PDF path
-txt_output_path = "output_tesseract.txt"  # Replace with your desired TXT output path
+if __name__ == "__main__":
+    # Example usage
+    pdf_path = "cropped_output_individual.pdf"  # Replace with your PDF path
+    txt_output_path = "output_tesseract.txt"  # Replace with your desired TXT output path
 
-pdf_to_text(pdf_path, txt_output_path)
+    pdf_to_text(pdf_path, txt_output_path, workers=os.cpu_count(), hybrid=False, use_cache=True)
@@ -0,0 +1,394 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+from disk_cache import SQLiteCache, DEFAULT_CACHE_DIR
+
+#Page rendering and OCR plumbing shared by extract_t.py and extract_t2.py
+
+COLORSPACES = {'rgb': fitz.csRGB, 'gray': fitz.csGRAY}
+
+# Passed down the pipeline queues after the last page
+_DONE = object()
+
+# Per-process state of the ocr_pool workers
+_worker = {}
+
+TARGET_X_HEIGHT = 20  # Pixels; tesseract reads best with an x-height of roughly 20 to 30 pixels
+X_HEIGHT_RATIO = 0.4  # x-height as a fraction of a word box (or text line) height in typical book fonts
+MIN_DPI = 72
+MAX_DPI = 400
+DETECT_DPI = 50  # Resolution of the quick render used to find the text area of image-only pages
+REGION_PADDING = 6  # Points kept around the detected text area
+
+LOW_DPI = 150  # First pass of the adaptive mode
+HIGH_DPI = 300  # Pages read with less than MIN_CONFIDENCE in the first pass are OCR'd again at this resolution
+MIN_CONFIDENCE = 80  # Mean tesseract word confidence (0-100)
+
+class PixmapArray(np.ndarray):
+    """NumPy view of pixmap samples that keeps the pixmap, which owns the memory, alive."""
+    pixmap = None
+
+def text_region(page):
+    """
+    Return (area, line height in points) of the text on a page. The text layer is used if there is one;
+    otherwise the ink of a quick low resolution render is measured. Returns (page.rect, None) for blank pages.
+    """
+    words = page.get_text("words")
+    if words:
+        boxes = np.array([word[:4] for word in words], dtype=float)
+        area = fitz.Rect(boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+        line_height = float(np.median(boxes[:, 3] - boxes[:, 1]))
+    else:
+        ink = pixmap_to_array(page.get_pixmap(dpi=DETECT_DPI, colorspace=fitz.csGRAY, alpha=False)) < 128
+        ink_rows = ink.any(axis=1)
+        rows = np.flatnonzero(ink_rows)
+        cols = np.flatnonzero(ink.any(axis=0))
+        if len(rows) == 0:
+            return page.rect, None
+        scale = 72 / DETECT_DPI
+        x0, y0 = page.rect.x0, page.rect.y0
+        area = fitz.Rect(x0 + cols[0] * scale, y0 + rows[0] * scale, x0 + (cols[-1] + 1) * scale, y0 + (rows[-1] + 1) * scale)
+        # Text lines show up as runs of rows with ink; their median length is the line height
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], ink_rows.astype(np.int8), [0]))))
+        line_height = float(np.median(edges[1::2] - edges[::2])) * scale
+    area = fitz.Rect(area.x0 - REGION_PADDING, area.y0 - REGION_PADDING, area.x1 + REGION_PADDING, area.y1 + REGION_PADDING)
+    return area & page.rect, line_height
+
+def choose_dpi(line_height):
+    """Resolution at which text of the given line height (points) gets an x-height of TARGET_X_HEIGHT pixels."""
+    if not line_height:
+        return MIN_DPI
+    dpi = TARGET_X_HEIGHT / (line_height * X_HEIGHT_RATIO) * 72
+    return int(min(MAX_DPI, max(MIN_DPI, dpi)))
+
+def render_page(page, dpi=72, colorspace='rgb', region='page'):
+    """
+    Render a page without alpha; 72 dpi is what get_pixmap() used by default.
+    The visible page is already only the cropbox. region='text' clips the render further to the detected
+    text area, and dpi='auto' picks the resolution that gives the text a TARGET_X_HEIGHT x-height.
+    """
+    clip = None
+    if region == 'text' or dpi == 'auto':
+        area, line_height = text_region(page)
+        if region == 'text':
+            clip = area
+        if dpi == 'auto':
+            dpi = choose_dpi(line_height)
+    return page.get_pixmap(dpi=dpi, colorspace=COLORSPACES[colorspace], alpha=False, clip=clip)
+
+def pixmap_to_array(pix):
+    """Return the pixmap samples as a (height, width[, 3]) uint8 array without copying them."""
+    array = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    array = array[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+    if pix.n == 1:
+        array = array[:, :, 0]
+    array = array.view(PixmapArray)
+    array.pixmap = pix
+    return array
+
+def pixmap_to_image(pix):
+    """
+    Hand the pixmap samples to PIL without the PNG encode/decode round trip.
+    Grayscale images share the pixmap memory; RGB needs one plain copy because PIL pads pixels to 4 bytes.
+    """
+    mode = 'L' if pix.n == 1 else 'RGB'
+    img = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+    img.pixmap = pix
+    return img
+
+MIN_NATIVE_CHARS = 50  # Text layers shorter than this are treated as image-only pages
+MAX_GARBLED_RATIO = 0.02  # Share of replacement or control characters above which a text layer is garbled
+MIN_ALNUM_RATIO = 0.5  # Share of letters and digits below which a text layer is garbled
+
+class NativeText(str):
+    """Text taken from the page's own text layer; the render, preprocess and OCR stages pass it through."""
+
+class CachedText(NativeText):
+    """Raw tesseract output found in the OCRCache; passed through like NativeText."""
+
+def native_text(page):
+    """Return the page's embedded text if it looks usable, or None if the page needs OCR."""
+    text = page.get_text()
+    stripped = ''.join(text.split())
+    if len(stripped) < MIN_NATIVE_CHARS:
+        return None
+    garbled = sum(1 for c in stripped if c == '\ufffd' or not c.isprintable())
+    alnum = sum(1 for c in stripped if c.isalnum())
+    if garbled / len(stripped) > MAX_GARBLED_RATIO or alnum / len(stripped) < MIN_ALNUM_RATIO:
+        return None
+    return NativeText(text)
+
+def report_paths(paths):
+    print(f"{paths['native']} page(s) read from the text layer, {paths['cache']} page(s) from the OCR cache, "
+          f"{paths['ocr']} page(s) OCR'd")
+
+class OCRCache(SQLiteCache):
+    """
+    On-disk SQLite cache of raw tesseract output, keyed by a hash of the rendered page pixels plus config,
+    which should name everything else that changes the output (language, --psm, preprocessing).
+    Once the stored text exceeds max_bytes, the least recently used entries are evicted.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT, size INTEGER, last_used REAL)",
+        "CREATE INDEX IF NOT EXISTS ocr_last_used ON ocr (last_used)",
+    )
+
+    def __init__(self, config, cache_dir=DEFAULT_CACHE_DIR, max_bytes=64 * 2**20):
+        super().__init__('ocr_cache.sqlite', cache_dir)
+        self.config = config
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(hits=0, misses=0)
+        return state
+
+    def key(self, pix):
+        digest = hashlib.sha256(self.config.encode())
+        digest.update(f"{pix.width}x{pix.height}x{pix.n}".encode())
+        digest.update(pix.samples_mv)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self.connection.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute("UPDATE ocr SET last_used = ? WHERE key = ?", (time.time(), key))
+            return CachedText(row[0])
+
+    def put(self, key, text):
+        size = len(text.encode('utf-8'))
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)", (key, text, size, time.time()))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM ocr").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for old_key, old_size in self.connection.execute("SELECT key, size FROM ocr ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((old_key,))
+                total -= old_size
+            self.connection.executemany("DELETE FROM ocr WHERE key = ?", evicted)
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        print(f"OCR cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0%} hit rate)")
+
+def data_to_text(data):
+    """
+    Rebuild the page text from pytesseract.image_to_data output (Output.DICT):
+    one line per text line, with a blank line between paragraphs.
+    """
+    lines = []
+    current = None
+    for block, paragraph, line, word in zip(data['block_num'], data['par_num'], data['line_num'], data['text']):
+        if not word.strip():
+            continue
+        if current == (block, paragraph, line):
+            lines[-1] += ' ' + word
+            continue
+        if current is not None and current[:2] != (block, paragraph):
+            lines.append('')
+        lines.append(word)
+        current = (block, paragraph, line)
+    return '\n'.join(lines)
+
+def mean_confidence(data):
+    """Mean word confidence of pytesseract.image_to_data output, or None if no words were found."""
+    confidences = [float(conf) for conf, word in zip(data['conf'], data['text']) if word.strip() and float(conf) >= 0]
+    if not confidences:
+        return None
+    return sum(confidences) / len(confidences)
+
+def _render_stage(pdf_path, dpi, colorspace, region, hybrid, cache, paths, outbox, errors):
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            for page in pdf_document:
+                if errors:
+                    break
+                text = native_text(page) if hybrid else None
+                if text is not None:
+                    paths['native'] += 1
+                    outbox.put((None, text))
+                    continue
+                pix = render_page(page, dpi, colorspace, region)
+                key = cache.key(pix) if cache else None
+                text = cache.get(key) if cache else None
+                if text is not None:
+                    paths['cache'] += 1
+                    outbox.put((None, text))
+                else:
+                    paths['ocr'] += 1
+                    outbox.put((key, pix))
+    except Exception as e:
+        errors.append(e)
+    outbox.put(_DONE)
+
+def _stage(function, passthrough, inbox, outbox, errors, cache=None):
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            break
+        if errors:
+            continue  # Keep draining so the stage before never blocks on a full queue
+        key, payload = item
+        try:
+            if not (passthrough and isinstance(payload, NativeText)):
+                payload = function(payload)
+                if cache and key:
+                    cache.put(key, payload)
+            outbox.put((key, payload))
+        except Exception as e:
+            errors.append(e)
+    outbox.put(_DONE)
+
+def ocr_pipeline(pdf_path, txt_output_path, preprocess, recognize, clean, dpi=72, colorspace='rgb', queue_size=2,
+                 hybrid=False, cache=None, region='page'):
+    """
+    Stream the pages through render -> preprocess -> recognize -> clean, each stage on its own thread,
+    connected by queues holding at most queue_size pages. preprocess receives the rendered pixmap.
+    Every page is written as soon as it is cleaned, so peak memory does not grow with the page count.
+    Each stage is a single thread, which keeps the pages in order.
+    With hybrid, pages with a usable text layer skip rendering and OCR and only go through clean.
+    With an OCRCache, pages whose pixels were OCR'd before skip preprocess and recognize.
+    dpi and region are passed to render_page.
+    """
+    errors = []
+    paths = Counter()
+    queues = [queue.Queue(queue_size) for _ in range(4)]
+    render_args = (pdf_path, dpi, colorspace, region, hybrid, cache, paths, queues[0], errors)
+    threads = [threading.Thread(target=_render_stage, args=render_args, daemon=True)]
+    stages = ((preprocess, True, None), (recognize, True, cache), (clean, False, None))
+    for (function, passthrough, stage_cache), inbox, outbox in zip(stages, queues, queues[1:]):
+        stage_args = (function, passthrough, inbox, outbox, errors, stage_cache)
+        threads.append(threading.Thread(target=_stage, args=stage_args, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    with open(txt_output_path, 'w', encoding='utf-8') as f:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            if not errors:
+                f.write(item[1] + "\n\n")
+                f.flush()
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    if hybrid or cache:
+        report_paths(paths)
+    if cache:
+        cache.report()
+
+def _init_ocr_worker(pdf_path, ocr_function, clean, dpi, colorspace, region, hybrid, cache, min_confidence, high_dpi):
+    # One tesseract thread per worker process; the pool already keeps every core busy
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    _worker.update(doc=fitz.open(pdf_path), ocr_function=ocr_function, clean=clean, dpi=dpi,
+                   colorspace=colorspace, region=region, hybrid=hybrid, cache=cache,
+                   min_confidence=min_confidence, high_dpi=high_dpi)
+
+def _adaptive_ocr(page, pix, info):
+    text, confidence = _worker['ocr_function'](pix)
+    info.update(dpi=pix.xres, confidence=confidence)
+    if confidence is None or confidence >= _worker['min_confidence']:
+        return text
+    info['retried'] = True
+    pix = render_page(page, _worker['high_dpi'], _worker['colorspace'], _worker['region'])
+    high_text, high_confidence = _worker['ocr_function'](pix)
+    if high_confidence is None or high_confidence < confidence:
+        return text
+    info.update(dpi=pix.xres, confidence=high_confidence)
+    return high_text
+
+def _ocr_worker_page(page_num):
+    start = time.perf_counter()
+    page = _worker['doc'][page_num]
+    cache = _worker['cache']
+    text = native_text(page) if _worker['hybrid'] else None
+    info = {'path': 'native', 'dpi': None, 'confidence': None, 'retried': False}
+    if text is None:
+        pix = render_page(page, _worker['dpi'], _worker['colorspace'], _worker['region'])
+        key = cache.key(pix) if cache else None
+        text = cache.get(key) if cache else None
+        info.update(path='cache', dpi=pix.xres)
+        if text is None:
+            info['path'] = 'ocr'
+            if _worker['min_confidence'] is None:
+                text = _worker['ocr_function'](pix)
+            else:
+                text = _adaptive_ocr(page, pix, info)
+            if cache:
+                cache.put(key, text)
+    return _worker['clean'](text), info, os.getpid(), time.perf_counter() - start
+
+def write_ocr_report(report_path, infos):
+    """Write a tab-separated sidecar with the source, resolution and mean word confidence of every page."""
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write("page\tpath\tdpi\tconfidence\tretried\n")
+        for page_num, info in enumerate(infos, 1):
+            confidence = '' if info['confidence'] is None else f"{info['confidence']:.1f}"
+            dpi = '' if info['dpi'] is None else info['dpi']
+            f.write(f"{page_num}\t{info['path']}\t{dpi}\t{confidence}\t{int(info['retried'])}\n")
+
+def ocr_pool(pdf_path, txt_output_path, ocr_function, clean, workers=None, dpi=72, colorspace='rgb',
+             hybrid=False, cache=None, region='page', min_confidence=None, high_dpi=HIGH_DPI, report_path=None):
+    """
+    OCR the pages in a pool of worker processes. Workers only receive page numbers: each opens the
+    document once, renders its pages itself and runs ocr_function(pixmap) for the raw text, then clean.
+    Both must be defined at module level. Results are written in page order as they arrive.
+    Prints pages per second and how busy each worker was. The other options work as in ocr_pipeline.
+    With min_confidence, ocr_function must return (text, mean word confidence) and pages read with less
+    than min_confidence at dpi are rendered and OCR'd again at high_dpi; the more confident text is kept.
+    With report_path, the source, dpi and confidence of every page are written there as TSV.
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        page_count = pdf_document.page_count
+
+    start = time.perf_counter()
+    busy = Counter()
+    pages_done = Counter()
+    paths = Counter()
+    infos = []
+    initargs = (pdf_path, ocr_function, clean, dpi, colorspace, region, hybrid, cache, min_confidence, high_dpi)
+    with multiprocessing.Pool(workers, initializer=_init_ocr_worker, initargs=initargs) as pool, \
+            open(txt_output_path, 'w', encoding='utf-8') as f:
+        for text, info, pid, elapsed in pool.imap(_ocr_worker_page, range(page_count)):
+            f.write(text + "\n\n")
+            infos.append(info)
+            paths[info['path']] += 1
+            busy[pid] += elapsed
+            pages_done[pid] += 1
+    wall_time = time.perf_counter() - start
+
+    print(f"OCR of {page_count} pages took {wall_time:.1f}s ({page_count / wall_time:.2f} pages/s)")
+    for i, pid in enumerate(sorted(busy)):
+        print(f"  worker {i + 1}: {pages_done[pid]} pages, {busy[pid] / wall_time:.0%} busy")
+    if min_confidence is not None:
+        retried = sum(info['retried'] for info in infos)
+        print(f"{retried} page(s) read below {min_confidence} confidence at {dpi} dpi were OCR'd again at {high_dpi} dpi")
+    if report_path:
+        write_ocr_report(report_path, infos)
+    if hybrid or cache:
+        report_paths(paths)
+    if cache:
+        # The workers kept their own counters, so report the totals from the page paths
+        cache.hits, cache.misses = paths['cache'], paths['ocr']
+        cache.report()
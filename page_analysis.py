@@ -0,0 +1,240 @@
+import hashlib
+import multiprocessing
+import os
+from functools import partial
+import fitz  # PyMuPDF
+import numpy as np
+from disk_cache import SQLiteCache, DEFAULT_CACHE_DIR
+
+#Word-level layout analysis shared by the automatic croppers
+
+# Document and LayoutCache opened once per worker process by map_pages
+_worker_doc = None
+_worker_cache = None
+
+def boxes_array(items):
+    """
+    Returns the x0, y0, x1, y1 of get_text("words") or get_text("blocks") items as an (n, 4) float array.
+    """
+    if not items:
+        return np.empty((0, 4))
+    return np.array([item[:4] for item in items], dtype=float)
+
+def words_array(page, cache=None):
+    """
+    Returns the words of a page as an (n, 4) float array of x0, y0, x1, y1, from the LayoutCache if given.
+    """
+    if cache is not None:
+        return cache.boxes(page, "words")
+    return boxes_array(page.get_text("words"))
+
+def blocks_array(page, cache=None):
+    """
+    Returns the text and image blocks of a page as an (n, 4) float array, from the LayoutCache if given.
+    """
+    if cache is not None:
+        return cache.boxes(page, "blocks")
+    return boxes_array(page.get_text("blocks"))
+
+class LayoutCache(SQLiteCache):
+    """
+    On-disk SQLite cache of the word and block boxes of every page (their heights give the font heights),
+    so re-running a cropper with other margins skips text extraction. Entries are keyed by a hash of the
+    file contents, the page number and the PyMuPDF version. The hash is only recomputed when a file's size
+    or modification time changes; entries of the contents it replaced are deleted then.
+    Hashes are also memoized in the object, so workers that receive it after file_hash was called never rehash.
+    """
+    SCHEMA = (
+        "PRAGMA journal_mode=WAL",
+        "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT)",
+        "CREATE TABLE IF NOT EXISTS layout (hash TEXT, page INTEGER, kind TEXT, version TEXT, boxes BLOB, "
+        "PRIMARY KEY (hash, page, kind, version))",
+    )
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        super().__init__('layout_cache.sqlite', cache_dir)
+        self.hashes = {}
+
+    def file_hash(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        memo = self.hashes.get(path)
+        if memo and memo[:2] == (stat.st_size, stat.st_mtime_ns):
+            return memo[2]
+        with self._lock:
+            row = self.connection.execute("SELECT size, mtime, hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row and tuple(row[:2]) == (stat.st_size, stat.st_mtime_ns):
+            file_hash = row[2]
+        else:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(2**20), b''):
+                    digest.update(chunk)
+            file_hash = digest.hexdigest()
+            with self._lock, self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                                        (path, stat.st_size, stat.st_mtime_ns, file_hash))
+                # Drop the layout of the replaced contents unless another file still has them
+                if row and row[2] != file_hash:
+                    still_used = self.connection.execute("SELECT 1 FROM files WHERE hash = ?", (row[2],)).fetchone()
+                    if not still_used:
+                        self.connection.execute("DELETE FROM layout WHERE hash = ?", (row[2],))
+        self.hashes[path] = (stat.st_size, stat.st_mtime_ns, file_hash)
+        return file_hash
+
+    def boxes(self, page, kind):
+        """
+        Returns the (n, 4) boxes of get_text(kind) for the page, extracting and storing them on a miss.
+        """
+        key = (self.file_hash(page.parent.name), page.number, kind, fitz.VersionBind)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT boxes FROM layout WHERE hash = ? AND page = ? AND kind = ? AND version = ?", key).fetchone()
+        if row is not None:
+            return np.frombuffer(row[0], dtype=float).reshape(-1, 4)
+        boxes = boxes_array(page.get_text(kind))
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO layout VALUES (?, ?, ?, ?, ?)", key + (boxes.tobytes(),))
+        return boxes
+
+def filter_main_text(boxes, page_height, top_margin, bottom_margin, strict=False, min_height_ratio=None):
+    """
+    Keeps the boxes between the header and footer margins (fractions of the page height).
+    With strict the margins themselves are excluded. With min_height_ratio, boxes shorter than that
+    fraction of the median height of all boxes on the page (likely footnotes) are dropped as well.
+    """
+    y0s, y1s = boxes[:, 1], boxes[:, 3]
+    if strict:
+        keep = (y0s > page_height * top_margin) & (y1s < page_height * (1 - bottom_margin))
+    else:
+        keep = (y0s >= page_height * top_margin) & (y1s <= page_height * (1 - bottom_margin))
+    if min_height_ratio is not None:
+        heights = y1s - y0s
+        keep &= heights >= np.median(heights) * min_height_ratio
+    return boxes[keep]
+
+def union_boxes(boxes):
+    """
+    Returns the union of the boxes as a fitz.Rect, or None if there are none.
+    Like fitz.Rect |=, empty boxes do not extend the union unless every box is empty.
+    """
+    if len(boxes) == 0:
+        return None
+    non_empty = boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+    if len(non_empty) == 0:
+        return fitz.Rect(*map(float, boxes[0]))
+    return fitz.Rect(
+        float(non_empty[:, 0].min()), float(non_empty[:, 1].min()),
+        float(non_empty[:, 2].max()), float(non_empty[:, 3].max())
+    )
+
+def _open_worker_doc(pdf_path, cache):
+    global _worker_doc, _worker_cache
+    _worker_doc = fitz.open(pdf_path)
+    _worker_cache = cache
+
+def _analyse_chunk(function, page_numbers):
+    if _worker_cache is None:
+        return [function(_worker_doc[page_num]) for page_num in page_numbers]
+    return [function(_worker_doc[page_num], cache=_worker_cache) for page_num in page_numbers]
+
+def map_pages(pdf_path, function, page_numbers, workers=None, chunk_size=16, cache=None):
+    """
+    Applies function to the given pages in a process pool and yields the results in page order.
+    Every worker opens the document once; pages are handed out in small contiguous chunks so slow
+    pages do not leave the other workers idle. function must be defined at module level and return
+    picklable values (tuples rather than fitz.Rect).
+    With a LayoutCache, function is called as function(page, cache=cache). The file is hashed here first
+    and the cache is sent to each worker once, so the workers neither rehash it nor reopen the cache per chunk.
+    """
+    if cache is not None:
+        cache.file_hash(pdf_path)
+    page_numbers = list(page_numbers)
+    chunks = [page_numbers[i:i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+    with multiprocessing.Pool(workers, initializer=_open_worker_doc, initargs=(pdf_path, cache)) as pool:
+        for results in pool.imap(partial(_analyse_chunk, function), chunks):
+            yield from results
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P-square algorithm (Jain & Chlamtac, 1985).
+    Keeps five markers no matter how many values are added; exact for up to five values.
+    """
+    def __init__(self, p=0.5):
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+class StreamingMedianBox:
+    """
+    Per-coordinate streaming median of boxes in constant memory.
+    Boxes are also fed alternately into two half-sample estimators; the largest disagreement between
+    the halves, in points, shows how stable the estimate is.
+    """
+    def __init__(self):
+        self.count = 0
+        self.medians = [P2Quantile() for _ in range(4)]
+        self.halves = ([P2Quantile() for _ in range(4)], [P2Quantile() for _ in range(4)])
+
+    def add(self, box):
+        for estimators in (self.medians, self.halves[self.count % 2]):
+            for estimator, value in zip(estimators, box):
+                estimator.add(value)
+        self.count += 1
+
+    def box(self):
+        if self.count == 0:
+            return None
+        return fitz.Rect(*(estimator.value() for estimator in self.medians))
+
+    def spread(self):
+        if self.count < 2:
+            return None
+        return max(abs(a.value() - b.value()) for a, b in zip(*self.halves))
@@ -0,0 +1,372 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+import fitz  # PyMuPDF
+from PIL import Image
+
+#Page previews for the click-crop GUIs, rendered only when a page is actually shown
+
+def render_preview(page, size=(600, 800)):
+    """
+    Renders a page straight at preview size instead of rasterizing at 200 dpi and downscaling.
+    One zoom makes the full page height span exactly size[1] rows, which keeps event.y / 800 an exact
+    fraction of the page height without stretching the page. Pages of another shape than size are
+    letterboxed against the left edge, so x stays in page pixels as in the zoomed tiles.
+    """
+    width, height = size
+    rect = page.rect
+    zoom = height / rect.height
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    # Float rounding can leave the pixmap one pixel off, which would skew the click mapping
+    if img.height != height:
+        img = img.resize((max(1, round(img.width * height / img.height)), height), Image.LANCZOS)
+    if img.width != width:
+        letterboxed = Image.new("RGB", size, "white")
+        letterboxed.paste(img, (0, 0))
+        img = letterboxed
+    return img
+
+class PageCache:
+    """
+    Renders preview images on demand and keeps the most recently used ones in a size-bounded LRU cache.
+    A background thread prefetches the pages following the one last requested, so paging forward rarely waits.
+    """
+    def __init__(self, pdf_path, total_pages, size=(600, 800), max_pages=16, prefetch=4):
+        self.pdf_path = pdf_path
+        self.doc = fitz.open(pdf_path)
+        self.total_pages = total_pages
+        self.size = size
+        # The cache must hold the current page plus everything being prefetched after it
+        self.max_pages = max(max_pages, prefetch + 2)
+        self.prefetch = prefetch
+        self.images = OrderedDict()
+        self.in_flight = {}
+        self.wanted = []
+        self.closed = False
+        self.lock = threading.Lock()
+        # PyMuPDF documents must not be used from two threads at once
+        self.render_lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.worker = threading.Thread(target=self.prefetch_loop, daemon=True)
+        self.worker.start()
+
+    def __len__(self):
+        return self.total_pages
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.total_pages:
+            raise IndexError(index)
+        image = self.get(index)
+        self.prefetch_after(index)
+        return image
+
+    def cached(self, index):
+        with self.lock:
+            return index in self.images
+
+    def placeholder(self, index, scale=8):
+        """
+        Renders a page at 1/scale of the preview size and scales it back up, as a quick stand-in while the
+        real preview renders. It has the preview's size, so clicks on it map to the same ratios.
+        """
+        width, height = self.size
+        with self.render_lock:
+            img = render_preview(self.doc[index], (width // scale, height // scale))
+        return img.resize(self.size, Image.BILINEAR)
+
+    def render(self, index):
+        with self.render_lock:
+            return render_preview(self.doc[index], self.size)
+
+    def get(self, index):
+        while True:
+            with self.lock:
+                if index in self.images:
+                    self.images.move_to_end(index)
+                    return self.images[index]
+                pending = self.in_flight.get(index)
+                if pending is None:
+                    pending = self.in_flight[index] = threading.Event()
+                    break
+            # Another thread is already rendering this page, wait for it instead of rendering twice
+            pending.wait()
+        try:
+            image = self.render(index)
+        except Exception:
+            self.abandon(index)
+            raise
+        return self.finish(index, image)
+
+    def finish(self, index, image):
+        with self.lock:
+            self.images[index] = image
+            self.images.move_to_end(index)
+            while len(self.images) > self.max_pages:
+                self.images.popitem(last=False)
+            self.in_flight.pop(index).set()
+        return image
+
+    def abandon(self, index):
+        with self.lock:
+            self.in_flight.pop(index).set()
+
+    def prefetch_after(self, index):
+        with self.lock:
+            self.wanted = list(range(index + 1, min(index + 1 + self.prefetch, self.total_pages)))
+            self.wakeup.notify()
+
+    def next_wanted(self):
+        """
+        Claims the next page to prefetch, or returns None. Must be called with the lock held.
+        """
+        while self.wanted:
+            index = self.wanted.pop(0)
+            if index not in self.images and index not in self.in_flight:
+                self.in_flight[index] = threading.Event()
+                return index
+        return None
+
+    def prefetch_loop(self):
+        while True:
+            with self.lock:
+                index = self.next_wanted()
+                while index is None and not self.closed:
+                    self.wakeup.wait()
+                    index = self.next_wanted()
+                if self.closed:
+                    if index is not None:
+                        self.in_flight.pop(index).set()
+                    return
+            try:
+                image = self.render(index)
+            except Exception as e:
+                print(f"Warning: Could not prefetch page {index + 1}. Error: {e}")
+                self.abandon(index)
+                continue
+            self.finish(index, image)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.wakeup.notify()
+        self.worker.join()
+        self.doc.close()
+
+class PageLoader:
+    """
+    Prepares pages for a Tk window on a worker thread, so rendering never blocks the event loop.
+    request() returns at once; the worker posts a low resolution placeholder (unless the page is cached)
+    and then the finished image to a queue that is polled with after(), so on_ready(index, image, final)
+    always runs on the Tk main thread. prepare(index, image), if given, runs on the worker for any further
+    analysis and returns the image to show. request(index, render) shows render() instead, such as a zoomed view.
+    With request(index, render, view), view is handed back with every image it produced, as
+    prepare(index, image, view) and on_ready(index, image, final, view), so callers know which view is on screen.
+    The time from request to the finished page being shown is logged.
+    """
+    def __init__(self, widget, images, on_ready, prepare=None, poll_ms=10):
+        self.widget = widget
+        self.images = images
+        self.on_ready = on_ready
+        self.prepare = prepare
+        self.poll_ms = poll_ms
+        self.current = None
+        self.generation = 0
+        self.requested_at = None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+        self.after_id = self.widget.after(self.poll_ms, self.poll)
+
+    def request(self, index, render=None, view=None):
+        self.generation += 1
+        self.current = self.generation
+        self.requested_at = time.perf_counter()
+        self.requests.put((self.generation, index, render, view))
+
+    def work(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            generation, index, render, view = item
+            # Skip requests the user has already moved past
+            if generation != self.current:
+                continue
+            try:
+                if render is not None:
+                    image = render()
+                else:
+                    if not self.images.cached(index):
+                        self.results.put((generation, index, self.images.placeholder(index), False, view))
+                    image = self.images[index]
+                if self.prepare is not None:
+                    image = self.prepare(index, image, view)
+            except Exception as e:
+                print(f"Warning: Could not load page {index + 1}. Error: {e}")
+                continue
+            self.results.put((generation, index, image, True, view))
+
+    def poll(self):
+        while True:
+            try:
+                generation, index, image, final, view = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.current:
+                continue
+            requested_at = self.requested_at
+            self.on_ready(index, image, final, view)
+            if final:
+                print(f"Page {index + 1} shown {(time.perf_counter() - requested_at) * 1000:.0f} ms after the click")
+        self.after_id = self.widget.after(self.poll_ms, self.poll)
+
+    def close(self):
+        self.widget.after_cancel(self.after_id)
+        self.current = None
+        self.requests.put(None)
+        self.worker.join()
+
+class TileCache:
+    """
+    Renders zoomed views of pages from fixed-size tiles. Each tile is a pixmap clipped to its own part of the
+    page, so a view at zoom z costs a few tiles instead of a full page z times the preview size.
+    The most recently used tiles are kept in a size-bounded LRU cache. Zoom levels must be integers so the
+    tiles divide the zoomed page evenly.
+    """
+    def __init__(self, pages, tile_size=(300, 400), max_tiles=64):
+        self.pages = pages
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def tile(self, index, zoom, column, row):
+        key = (index, zoom, column, row)
+        with self.lock:
+            if key in self.tiles:
+                self.tiles.move_to_end(key)
+                return self.tiles[key]
+        height = self.pages.size[1]
+        tile_width, tile_height = self.tile_size
+        with self.pages.render_lock:
+            page = self.pages.doc[index]
+            rect = page.rect
+            # Same single zoom as render_preview, so zoomed pixels line up with the preview
+            scale = height * zoom / rect.height
+            clip = fitz.Rect(
+                rect.x0 + column * tile_width / scale, rect.y0 + row * tile_height / scale,
+                rect.x0 + (column + 1) * tile_width / scale, rect.y0 + (row + 1) * tile_height / scale
+            ) & rect
+            if clip.is_empty:
+                # Tiles right of a narrow page fall in its letterbox
+                pix = None
+            else:
+                pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+        if pix is None:
+            img = Image.new("RGB", self.tile_size, "white")
+        else:
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        with self.lock:
+            self.tiles[key] = img
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        return img
+
+    def view(self, index, zoom, left, top):
+        """
+        Returns the preview-sized part of page index at the given zoom whose top left corner is (left, top),
+        in pixels of the zoomed page.
+        """
+        width, height = self.pages.size
+        tile_width, tile_height = self.tile_size
+        img = Image.new("RGB", (width, height), "white")
+        for row in range(top // tile_height, (top + height - 1) // tile_height + 1):
+            for column in range(left // tile_width, (left + width - 1) // tile_width + 1):
+                img.paste(self.tile(index, zoom, column, row), (column * tile_width - left, row * tile_height - top))
+        return img
+
+class ZoomView:
+    """
+    Zoom and pan state of a click GUI's page view. Maps clicks on the zoomed view back to fractions of the
+    full page height, which at zoom z is z times as precise as a click on the plain preview.
+    Changes take effect at once but their image arrives later from the PageLoader, so clicks are mapped with
+    shown, the (zoom, left, top) of the view actually on screen, which the GUI sets from on_ready.
+    """
+    def __init__(self, tiles, zoom=4):
+        self.tiles = tiles
+        self.max_zoom = zoom
+        self.shown = (1, 0, 0)
+        self.reset()
+
+    def reset(self):
+        self.zoom = 1
+        self.left = 0
+        self.top = 0
+
+    def state(self):
+        return (self.zoom, self.left, self.top)
+
+    def toggle(self, x, y):
+        """
+        Zooms in centred on the point (x, y) of the view on screen, or back out to the whole page.
+        """
+        if self.zoom > 1:
+            self.reset()
+            return
+        width, height = self.tiles.pages.size
+        zoom, left, top = self.shown
+        self.zoom = self.max_zoom
+        self.pan_to((left + x) * self.zoom / zoom - width // 2, (top + y) * self.zoom / zoom - height // 2)
+
+    def pan(self, dx, dy):
+        self.pan_to(self.left + dx, self.top + dy)
+
+    def pan_to(self, left, top):
+        width, height = self.tiles.pages.size
+        self.left = int(min(max(left, 0), width * (self.zoom - 1)))
+        self.top = int(min(max(top, 0), height * (self.zoom - 1)))
+
+    def ratio(self, y):
+        zoom, left, top = self.shown
+        return (top + y) / (self.tiles.pages.size[1] * zoom)
+
+    def renderer(self, index):
+        """
+        Returns a function rendering the current view of page index, for PageLoader.request.
+        """
+        zoom, left, top = self.zoom, self.left, self.top
+        return lambda: self.tiles.view(index, zoom, left, top)
+
+    def request(self, loader, index):
+        """
+        Asks loader for the current view of page index, tagged with its state.
+        """
+        loader.request(index, self.renderer(index) if self.zoom > 1 else None, self.state())
+
+    def bind(self, widget, on_change):
+        """
+        Right click on widget zooms in around the pointer so cuts can be placed precisely, and back out again.
+        The mouse wheel and the arrow keys of its window pan the zoomed view. on_change() requests the new view.
+        """
+        def toggle(event):
+            self.toggle(event.x, event.y)
+            on_change()
+
+        def pan(dx, dy):
+            if self.zoom > 1:
+                self.pan(dx, dy)
+                on_change()
+
+        widget.bind('<Button-3>', toggle)
+        # Windows reports wheel steps of 120 and macOS of 1, so only the direction is used; X11 sends buttons 4 and 5
+        widget.bind('<MouseWheel>', lambda event: pan(0, -100 if event.delta > 0 else 100))
+        widget.bind('<Button-4>', lambda event: pan(0, -100))
+        widget.bind('<Button-5>', lambda event: pan(0, 100))
+        window = widget.winfo_toplevel()
+        window.bind('<Up>', lambda event: pan(0, -100))
+        window.bind('<Down>', lambda event: pan(0, 100))
+        window.bind('<Left>', lambda event: pan(-100, 0))
+        window.bind('<Right>', lambda event: pan(100, 0))
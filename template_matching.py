@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+#Template matching for the prediction phase of click_crop_automated1
+
+def to_gray(img):
+    """
+    Converts a PIL image or RGB array to a single-channel uint8 array.
+    """
+    array = np.asarray(img)
+    if array.ndim == 2:
+        return array
+    return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+class TemplateMatcher:
+    """
+    Finds a horizontal strip template on a page, working in grayscale and searching only a vertical band
+    around the expected position. The band is doubled whenever the confidence drops below min_confidence,
+    up to the whole page. With pyramid_levels > 0 the band is first searched on a downsampled page and
+    the match is then refined at full resolution. Confidence is the TM_CCOEFF_NORMED max_val, as before.
+    """
+    def __init__(self, template, band=60, min_confidence=0.6, pyramid_levels=0, max_cached=32):
+        self.template = to_gray(template)
+        self.band = band
+        self.min_confidence = min_confidence
+        self.pyramid_levels = pyramid_levels
+        self.max_cached = max_cached
+        self.templates = self.build_pyramid(self.template)
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def build_pyramid(self, array):
+        levels = [array]
+        for _ in range(self.pyramid_levels):
+            levels.append(cv2.pyrDown(levels[-1]))
+        return levels
+
+    def page_levels(self, img, key=None):
+        """
+        Returns the grayscale pyramid of a page, cached under key so repeated matches skip the conversion.
+        """
+        if key is not None:
+            with self.lock:
+                if key in self.pages:
+                    self.pages.move_to_end(key)
+                    return self.pages[key]
+        levels = self.build_pyramid(to_gray(img))
+        if key is not None:
+            with self.lock:
+                self.pages[key] = levels
+                while len(self.pages) > self.max_cached:
+                    self.pages.popitem(last=False)
+        return levels
+
+    def match_rows(self, page, template, top, bottom):
+        """
+        Matches template against rows top:bottom of page and returns (y, max_val) in page coordinates.
+        """
+        top = max(0, top)
+        bottom = min(page.shape[0], bottom)
+        if bottom - top < template.shape[0]:
+            return None, -1.0
+        result = cv2.matchTemplate(page[top:bottom], template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return top + max_loc[1], max_val
+
+    def match_band(self, levels, center_y, band):
+        half = self.template.shape[0] // 2
+        if self.pyramid_levels == 0:
+            return self.match_rows(levels[0], self.template, center_y - band - half, center_y + band + half)
+        scale = 2 ** self.pyramid_levels
+        coarse_y, _ = self.match_rows(levels[-1], self.templates[-1],
+                                      (center_y - band - half) // scale, (center_y + band + half) // scale + 1)
+        if coarse_y is None:
+            return None, -1.0
+        # Refine within a couple of coarse pixels of the coarse hit
+        fine_y = coarse_y * scale
+        return self.match_rows(levels[0], self.template, fine_y - 2 * scale, fine_y + 2 * scale + self.template.shape[0])
+
+    def match(self, img, center_y, key=None):
+        levels = self.page_levels(img, key)
+        page_height = levels[0].shape[0]
+        band = self.band
+        best_y, best_val = None, -1.0
+        while True:
+            match_y, max_val = self.match_band(levels, center_y, band)
+            if max_val > best_val:
+                best_y, best_val = match_y, max_val
+            if best_val >= self.min_confidence or band >= page_height:
+                return best_y, best_val
+            band *= 2
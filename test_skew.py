@@ -0,0 +1,55 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+pytest.importorskip("fitz")
+pytest.importorskip("pytesseract")
+
+from extract_t2 import skew_angle, estimate_skew, SKEW_MAX_ERROR
+
+ROTATIONS = (-3.0, -1.0, -0.3, 0.5, 2.0)
+
+def text_page(height=2200, width=1600):
+    """
+    A binary page with a block of word-like runs on evenly spaced lines, well inside the margins
+    so rotating it by a few degrees does not clip it.
+    """
+    page = np.zeros((height, width), dtype=np.uint8)
+    for line, y in enumerate(range(300, 1900, 40)):
+        x = 300
+        for word in range(12):
+            length = 40 + (line * 7 + word * 13) % 50
+            page[y:y + 18, x:min(x + length, 1300)] = 255
+            x += length + 25
+            if x >= 1300:
+                break
+    return page
+
+def rotated(page, rotation):
+    h, w = page.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), rotation, 1.0)
+    return cv2.warpAffine(page, M, (w, h), flags=cv2.INTER_NEAREST)
+
+def full_resolution_skew(binary):
+    return skew_angle(np.column_stack(np.where(binary > 0)))
+
+@pytest.mark.parametrize("rotation", ROTATIONS)
+def test_estimate_matches_full_resolution(rotation):
+    binary = rotated(text_page(), rotation)
+    assert abs(estimate_skew(binary) - full_resolution_skew(binary)) <= SKEW_MAX_ERROR
+
+@pytest.mark.parametrize("rotation", ROTATIONS)
+def test_estimate_recovers_rotation(rotation):
+    page = text_page()
+    angle = estimate_skew(rotated(page, rotation))
+    assert abs(abs(angle) - abs(rotation)) <= SKEW_MAX_ERROR
+    # Opposite rotations need opposite corrections
+    assert abs(angle + estimate_skew(rotated(page, -rotation))) <= 2 * SKEW_MAX_ERROR
+
+def test_straight_page():
+    assert abs(estimate_skew(text_page())) <= SKEW_MAX_ERROR
+
+def test_blank_page():
+    blank = np.zeros((2200, 1600), dtype=np.uint8)
+    assert skew_angle(np.column_stack(np.where(blank > 0))) == 0
+    assert estimate_skew(blank) == 0
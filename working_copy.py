@@ -0,0 +1,23 @@
+import os
+import fitz  # PyMuPDF
+
+#Output file handling shared by the interactive croppers, which save after every command
+
+def open_working_copy(pdf_path, new_file_path):
+    """
+    Writes a full copy of the input once and reopens it, so every later change can be appended
+    to it with an incremental save instead of rewriting the whole file.
+    """
+    source = fitz.open(pdf_path)
+    source.save(new_file_path)
+    source.close()
+    return fitz.open(new_file_path)
+
+def compact(doc, new_file_path):
+    """
+    Rewrites the working copy without the stacked incremental updates.
+    """
+    temp_path = new_file_path + '.tmp'
+    doc.save(temp_path)
+    doc.close()
+    os.replace(temp_path, new_file_path)